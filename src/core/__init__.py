@@ -1,3 +1,4 @@
 from . import fgen
+from . import backends
 from . import controller
 from . import filemgmt
@@ -0,0 +1,225 @@
+#foreign
+import os
+import threading
+import time
+import numpy as np
+try:
+    import numba
+except ImportError:
+    numba = None
+
+#project
+import lib.wxdyn.log as  log
+import core.fgen
+
+# features a backend can support, a generator requires them for smooth colouring, for areas that
+# need extended precision (perturbation or double-double) and for animations of more than one frame
+FEATURE_SMOOTH = "smooth"
+FEATURE_EXTENDED_PRECISION = "extendedPrecision"
+FEATURE_FRAMES = "frames"
+# backend name that selects the fastest backend supporting the required features
+AUTO = "auto"
+# area, size and maxIt of the calibration render, the same frame for every backend. The area lies 
+# in the seahorse valley on the boundary of the set, three quarters of its pixels escape, and the 
+# size is large enough for the generators to split it into tiles. The render skips no interior 
+# pixels (interiorCheck is off), so it times the iterations and not the interior test
+CALIBRATION_AREA = (-0.76, -0.74, 0.09, 0.11)
+CALIBRATION_SIZE = (512, 512)
+CALIBRATION_MAXIT = 256
+# size of the render of the calibration area that measures the fixed cost of a render
+CALIBRATION_OVERHEAD_SIZE = (32, 24)
+
+class Backend:
+    """
+    A way of running the generators, e.g. with scalar loops, vectorized or on worker processes.
+    configure sets up a generator to run on the backend, it may replace the kernels of the
+    generator (see FractalGenerator.kernels). The workers and vectorized settings of the backend 
+    are defaults, a value the caller gave to setup is kept (see FractalGenerator.setDefaults). features holds the features the backend supports.
+    benchmark renders the calibration frame and returns the cost of a render (see estimate)
+    """
+    name = None
+    features = frozenset()
+
+    def isAvailable(self):
+        return True
+
+    def supports(self, features):
+        return set(features) <= self.features
+
+    def configure(self, generator):
+        pass
+
+    def render(self, size):
+        # seconds taken by a render of the calibration area at size
+        generator = core.fgen.MandelbrotGenerator(None, size, [CALIBRATION_AREA], CALIBRATION_MAXIT)
+        generator.setup(interiorCheck=False)
+        self.configure(generator)
+        t = time.perf_counter()
+        generator.plot()
+        return time.perf_counter() - t
+
+    def benchmark(self):
+        """
+        the fixed cost of a render in seconds and the cost in seconds of an iteration of a pixel, 
+        from renders of the calibration area at CALIBRATION_OVERHEAD_SIZE and CALIBRATION_SIZE
+        """
+        w,h = CALIBRATION_SIZE
+        overhead = self.render(CALIBRATION_OVERHEAD_SIZE)
+        total = self.render(CALIBRATION_SIZE)
+        return (overhead, max(total - overhead, 1e-9) / (w*h*CALIBRATION_MAXIT))
+
+class PythonBackend(Backend):
+    name = "python"
+    features = frozenset([FEATURE_FRAMES])
+
+    def configure(self, generator):
+        generator.setDefaults(vectorized=False, workers=1)
+        generator.setup(kernels={})
+
+class NumpyBackend(Backend):
+    name = "numpy"
+    features = frozenset([FEATURE_SMOOTH, FEATURE_EXTENDED_PRECISION, FEATURE_FRAMES])
+
+    def configure(self, generator):
+        generator.setDefaults(vectorized=True, workers=1)
+        generator.setup(kernels={})
+
+class MultiprocessBackend(Backend):
+    name = "multiprocess"
+    features = frozenset([FEATURE_SMOOTH, FEATURE_EXTENDED_PRECISION, FEATURE_FRAMES])
+
+    def isAvailable(self):
+        return (os.cpu_count() or 1) > 1
+
+    def configure(self, generator):
+        generator.setDefaults(vectorized=True, workers=os.cpu_count())
+        generator.setup(kernels={})
+
+class NumbaBackend(Backend):
+    name = "numba"
+    features = frozenset([FEATURE_FRAMES])
+
+    def isAvailable(self):
+        return numba!=None
+
+    def configure(self, generator):
+        generator.setDefaults(vectorized=True, workers=1)
+        generator.setup(kernels={core.fgen.mandelbrotKernel: numbaMandelbrotKernel, core.fgen.juliaKernel: numbaJuliaKernel})
+
+    def benchmark(self):
+        # the first call compiles the loop
+        escapeTimeLoop(np.zeros(1, dtype=np.complex128), np.zeros(1, dtype=np.complex128), 2, np.zeros(1, dtype=np.int64))
+        return super().benchmark()
+
+def escapeTimeLoop(z, c, maxIt, counts):
+    # escape time of the pixels z (flat arrays), as the scalar loops of the generators count it
+    for k in range(z.size):
+        zk = z[k]
+        ck = c[k]
+        i = 0
+        for i in range(maxIt):
+            if abs(zk) > 2.0: break
+            zk = zk * zk + ck
+        counts[k] = i
+
+if numba!=None:
+    escapeTimeLoop = numba.njit(cache=True)(escapeTimeLoop)
+
+def numbaMandelbrotKernel(grid, maxIt, smooth=False, interiorCheck=True, period=None, stats=None, z=None, start=0, final=None):
+    # the compiled loop computes whole counts from z=0, anything else is left to mandelbrotKernel
+    if smooth or period!=None or z is not None or final is not None:
+        return core.fgen.mandelbrotKernel(grid, maxIt, smooth, interiorCheck, period, stats, z, start, final)
+    counts = np.full(grid.shape, maxIt-1, dtype=np.int64)
+    exterior = np.ones(grid.shape, dtype=bool)
+    if interiorCheck:
+        exterior = ~core.fgen.isInterior(grid.real, grid.imag)
+        core.fgen.addStat(stats, "interiorPixels", grid.size - np.count_nonzero(exterior))
+    c = np.ascontiguousarray(grid[exterior], dtype=np.complex128)
+    exteriorCounts = np.empty(c.size, dtype=np.int64)
+    escapeTimeLoop(np.zeros_like(c), c, maxIt, exteriorCounts)
+    counts[exterior] = exteriorCounts
+    return counts
+
+def numbaJuliaKernel(grid, maxIt, smooth=False, c=0j, period=None, stats=None, z=None, start=0, final=None):
+    # the compiled loop computes whole counts from the pixels, anything else is left to juliaKernel
+    if smooth or period!=None or z is not None or final is not None:
+        return core.fgen.juliaKernel(grid, maxIt, smooth, c, period, stats, z, start, final)
+    z = np.ascontiguousarray(grid, dtype=np.complex128).reshape(-1)
+    counts = np.empty(z.size, dtype=np.int64)
+    escapeTimeLoop(z, np.full(z.size, c, dtype=np.complex128), maxIt, counts)
+    return counts.reshape(grid.shape)
+
+__backends = {}
+__calibration = {}
+__lock = threading.Lock()
+
+def registerBackend(backend):
+    assert isinstance(backend, Backend) and backend.name!=None
+    __backends[backend.name] = backend
+
+def getBackend(name):
+    return __backends.get(name)
+
+def getBackends():
+    return list(__backends.values())
+
+def getBackendNames():
+    # the names a project can choose from, AUTO first
+    return [AUTO] + [b.name for b in getBackends() if b.isAvailable()]
+
+def calibrate():
+    """
+    runs the benchmark of every available backend that was not calibrated yet, returns the 
+    cost (fixed cost, cost of a pixel iteration) per backend name. Takes seconds and compiles 
+    the numba loop, call it off the event loop (see configure)
+    """
+    with __lock:
+        for backend in getBackends():
+            if backend.isAvailable() and not backend.name in __calibration:
+                __calibration[backend.name] = backend.benchmark()
+                log.debug(function=calibrate, args=backend.name, returns=__calibration[backend.name])
+        return dict(__calibration)
+
+def getRequiredFeatures(generator):
+    # the features needed to render all areas of the (set up) generator
+    features = set()
+    if generator.smooth: features.add(FEATURE_SMOOTH)
+    if len(generator.areas)>1: features.add(FEATURE_FRAMES)
+    current = generator.area
+    for area in generator.areas:
+        generator.area = area
+        if generator.needsExtendedPrecision(): features.add(FEATURE_EXTENDED_PRECISION)
+    generator.area = current
+    return features
+
+def estimate(cost, pixels, maxIt):
+    # seconds a backend with the calibrated cost takes to iterate pixels up to maxIt times
+    overhead, iteration = cost
+    return overhead + pixels*maxIt*iteration
+
+def selectBackend(features=(), pixels=CALIBRATION_SIZE[0]*CALIBRATION_SIZE[1], maxIt=CALIBRATION_MAXIT):
+    # the calibrated backend that supports features and renders pixels up to maxIt iterations the fastest
+    calibration = calibrate()
+    candidates = [b for b in getBackends() if b.isAvailable() and b.supports(features)]
+    return min(candidates, key=lambda b: estimate(calibration[b.name], pixels, maxIt))
+
+def configure(generator, name=AUTO):
+    """
+    sets up generator to run on the backend with the given name, or on the fastest backend for 
+    its size, number of frames and maxIt when name is AUTO or the named backend is unavailable 
+    or lacks a required feature. Calibrates the backends on first use (see calibrate). 
+    Returns the backend
+    """
+    features = getRequiredFeatures(generator)
+    backend = getBackend(name)
+    if backend==None or not backend.isAvailable() or not backend.supports(features):
+        w,h = generator.size
+        backend = selectBackend(features, len(generator.areas)*w*h, generator.maxIt or CALIBRATION_MAXIT)
+    log.debug(function=configure, args=(name, features), returns=backend.name)
+    backend.configure(generator)
+    return backend
+
+registerBackend(PythonBackend())
+registerBackend(NumpyBackend())
+registerBackend(MultiprocessBackend())
+registerBackend(NumbaBackend())
@@ -1,11 +1,11 @@
 #foreign
-import asyncio
 import json
 
 #project
 import lib.wxdyn.log as  log
 from core.model import Model
 import core.filemgmt as filemgmt
+from core.preview import PreviewScheduler
 
 class Controller:
     def __init__(self, model):
@@ -13,6 +13,7 @@ class Controller:
         assert isinstance(model, Model)
         self.model = model
         self.ps = filemgmt.ProjectStorage()
+        self.previewScheduler = None
 
     def reset(self):
         self.model.init()
@@ -40,16 +41,23 @@ class Controller:
     async def animate(self, progressHandler=None):
         await self.model.animate(progressHandler)
 
+    async def exportAnimation(self, path, progressHandler=None):
+        await self.model.exportAnimation(path, progressHandler)
+
     async def generate(self, progressHandler=None, **kw):
         await self.model.generate(progressHandler, **kw)
 
-    async def startPreview(self, **setup):
+    def startPreview(self, **setup):
         log.trace(function=self.startPreview)
-        while self.getCurrentProject().getPreview():
-            if self.getCurrentProject().isModified(True):
-                await self.getModel().preview(**setup)
-            await asyncio.sleep(3)
-        log.trace("previewing stopped")
+        self.stopPreview()
+        self.previewScheduler = PreviewScheduler(self.model, **setup)
+        self.previewScheduler.start()
+
+    def stopPreview(self):
+        if self.previewScheduler!=None:
+            self.previewScheduler.stop()
+            self.previewScheduler = None
+            log.trace("previewing stopped")
 
     def getGeneratedImage(self):
         return self.model.getGeneratedImage()
@@ -0,0 +1,154 @@
+#foreign
+import os
+import queue
+import struct
+import threading
+import zlib
+import numpy as np
+from PIL import GifImagePlugin
+
+#project
+import lib.wxdyn.log as  log
+
+class ExportError(Exception):
+    pass
+
+class FrameSequence:
+    """
+    Presents the frames that are still to arrive as a single multi-frame image, so
+    PIL's WebP encoder pulls them one by one instead of requiring a list of all frames
+    """
+    def __init__(self, frames, n):
+        self.__frames = frames
+        self.__current = None
+        self.n_frames = n
+
+    def seek(self, idx):
+        self.__current = next(self.__frames)
+
+    def tell(self):
+        return 0
+
+    def __getattr__(self, name):
+        return getattr(self.__current, name)
+
+class AnimationExporter:
+    """
+    Encodes an animation to GIF, APNG or WebP (chosen by the file extension) in a background
+    thread while the frames are still being produced. addFrame blocks while maxQueuedFrames
+    frames are waiting to be encoded, so only a few frames are held in memory at any time.
+    progressHandler(exporter, percent) is called from the encoder thread after each frame.
+    """
+    FORMATS = {".gif": "GIF", ".png": "PNG", ".apng": "PNG", ".webp": "WEBP"}
+    MAX_QUEUED_FRAMES = 4
+
+    def __init__(self, path, frameCount, duration=120, loop=0, progressHandler=None, maxQueuedFrames=MAX_QUEUED_FRAMES):
+        ext = os.path.splitext(path)[1].lower()
+        if not ext in AnimationExporter.FORMATS:
+            raise ExportError("unsupported animation format: " + ext)
+        self.path = path
+        self.format = AnimationExporter.FORMATS[ext]
+        self.frameCount = frameCount
+        self.duration = duration
+        self.loop = loop
+        self.progressHandler = progressHandler
+        self.framesEncoded = 0
+        self.__queue = queue.Queue(maxsize=maxQueuedFrames)
+        self.__thread = None
+        self.__error = None
+        self.__aborted = False
+
+    def start(self):
+        log.debug(function=self.start, args=(self.path, self.format, self.frameCount))
+        self.__thread = threading.Thread(target=self.__encode, name="AnimationExporter", daemon=True)
+        self.__thread.start()
+
+    def addFrame(self, im):
+        if self.__error!=None: raise ExportError(self.__error)
+        self.__queue.put(im)
+
+    def finish(self):
+        self.__queue.put(None)
+        self.__thread.join()
+        if self.__error!=None: raise ExportError(self.__error)
+        log.trace(function=self.finish, returns=(self.path, self.framesEncoded))
+
+    def abort(self):
+        self.__aborted = True
+        self.__queue.put(None)
+        self.__thread.join()
+
+    def frames(self):
+        # yields the queued frames until finish() or abort() is called
+        while True:
+            im = self.__queue.get()
+            if im==None or self.__aborted: return
+            yield im
+            self.framesEncoded += 1
+            if self.progressHandler!=None:
+                self.progressHandler(self, int(self.framesEncoded*100/self.frameCount))
+
+    def __encode(self):
+        try:
+            with open(self.path, "wb") as fp:
+                if self.format=="GIF": self.writeGif(fp)
+                elif self.format=="PNG": self.writeApng(fp)
+                elif self.format=="WEBP": self.writeWebp(fp)
+        except Exception as e:
+            log.error(e, function=self.__encode)
+            self.__error = e
+            # keep draining the queue, so addFrame does not block forever
+            while self.__queue.get()!=None: pass
+
+    def writeGif(self, fp):
+        # indexed frames are written with their own palette, only frames with a different 
+        # palette than the first one need a local colour table
+        globalPalette = None
+        for im in self.frames():
+            pim = im if im.mode=="P" else im.convert("RGB").quantize(256)
+            if globalPalette==None:
+                globalPalette = pim.getpalette()
+                header, used = GifImagePlugin.getheader(pim, info={"loop": self.loop, "duration": self.duration})
+                for block in header: fp.write(block)
+            localPalette = pim.getpalette()!=globalPalette
+            for block in GifImagePlugin.getdata(pim, (0, 0), duration=self.duration, include_color_table=localPalette):
+                fp.write(block)
+        fp.write(b";")
+
+    def writeApng(self, fp):
+        # acTL holds the number of frames, it is written with the first frame and patched at the end
+        sequence = 0
+        actlPos = None
+        for im in self.frames():
+            im = im.convert("RGB")
+            w, h = im.size
+            if actlPos==None:
+                fp.write(b"\x89PNG\r\n\x1a\n")
+                writeChunk(fp, b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 2, 0, 0, 0))
+                actlPos = fp.tell()
+                writeChunk(fp, b"acTL", struct.pack(">II", 0, self.loop))
+            writeChunk(fp, b"fcTL", struct.pack(">IIIIIHHBB", sequence, w, h, 0, 0, self.duration, 1000, 0, 0))
+            sequence += 1
+            rows = np.asarray(im).reshape(h, w*3)
+            data = zlib.compress(np.hstack([np.zeros((h, 1), dtype=np.uint8), rows]).tobytes())
+            if sequence==1:
+                writeChunk(fp, b"IDAT", data)
+            else:
+                writeChunk(fp, b"fdAT", struct.pack(">I", sequence) + data)
+                sequence += 1
+        writeChunk(fp, b"IEND", b"")
+        if actlPos!=None:
+            fp.seek(actlPos)
+            writeChunk(fp, b"acTL", struct.pack(">II", self.framesEncoded, self.loop))
+
+    def writeWebp(self, fp):
+        frames = self.frames()
+        first = next(frames, None)
+        if first==None: return
+        first.save(fp, format="WEBP", save_all=True, duration=self.duration, loop=self.loop,
+            append_images=[FrameSequence(frames, self.frameCount-1)])
+        for im in frames: pass
+
+def writeChunk(fp, chunkType, data):
+    fp.write(struct.pack(">I", len(data)) + chunkType + data)
+    fp.write(struct.pack(">I", zlib.crc32(chunkType + data) & 0xffffffff))
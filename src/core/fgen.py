@@ -1,8 +1,71 @@
+import asyncio
+import contextlib
+import copy
+import functools
+import cmath
 import math
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from decimal import Decimal, getcontext, localcontext
+from multiprocessing import shared_memory
 from PIL import Image
 import random
 import numpy as np
 import lib.wxdyn.log as  log
+
+# number of pixels iterated together by the vectorized generators
+BAND_SIZE = 1<<18
+# width and height of the tiles that are distributed over the worker processes
+TILE_SIZE = 128
+# number of entries in the palette of indexed ('P' mode) images
+PALETTE_SIZE = 256
+# type of the fractional parts of smooth plot values, kept apart from the whole escape counts
+FRACTION_DTYPE = np.float16
+# rectangles of the subdivision renderer up to this width or height are computed completely
+SUBDIVISION_MIN_SIZE = 8
+# pixel strides of the passes of a progressive render, from coarse to fine
+PROGRESSIVE_STRIDES = (8, 4, 2, 1)
+# pixel pitch, relative to the magnitude of the coordinates, below which float64 pixel coordinates 
+# become too coarse and the generators switch to extended precision (perturbation or double-double)
+EXTENDED_PRECISION_PITCH = 1e-13
+# pixel pitch, relative to the magnitude of the coordinates, from which float32 pixel coordinates 
+# are fine enough and the vectorized generators iterate in complex64 (see useFloat32)
+FLOAT32_PITCH = 1e-3
+# number of significant decimal digits kept below the pixel pitch in areas and reference orbits
+REFERENCE_DIGITS = 20
+# number of terms of the series approximation, and its tolerated truncation error relative 
+# to the difference between the orbits of neighbouring pixels
+SERIES_TERMS = 4
+SERIES_TOLERANCE = 1e-3
+# largest error of the series approximation at its probes, relative to the difference between 
+# the orbits of neighbouring pixels, see seriesApproximation
+SERIES_PROBE_TOLERANCE = 1e-9
+# default tolerance and first checkpoint interval of the orbit periodicity check
+PERIOD_TOLERANCE = 1e-12
+PERIOD_INTERVAL = 8
+# the vectorized periodicity check compares the orbits with their saved points every this many iterations
+PERIOD_CHECK_STRIDE = 8
+# symmetries of the fractals: the mirror image in the real axis (Mandelbrot) and the point 
+# reflection through the origin (Julia), see mirroredPixels
+SYMMETRY_CONJUGATE = "conjugate"
+SYMMETRY_POINT = "point"
+# significant bits the pixel pitch is rounded to, so areas that differ by rounding errors (a 
+# pan or resize of a view) share the lattice of their pixel coordinates (see pixelCoordinates)
+GRID_PITCH_BITS = 40
+# number of gradients kept by Source, per (heatmap, width, reverse)
+GRADIENT_CACHE_SIZE = 32
+# automatic maxIt: bounds, the area width at which the estimate from the zoom depth is 
+# AUTO_MAXIT_MIN, the longest side of the probe render and the number of histogram bins
+AUTO_MAXIT_MIN = 64
+AUTO_MAXIT_MAX = 1<<16
+AUTO_REFERENCE_WIDTH = 3.0
+AUTO_PROBE_SIZE = 64
+AUTO_HISTOGRAM_BINS = 32
+# maxIt is doubled while more than this fraction of the probe pixels are unresolved boundary 
+# pixels, and while doubling resolves at least AUTO_MIN_GAIN of them
+AUTO_UNRESOLVED_FRACTION = 0.02
+AUTO_MIN_GAIN = 0.1
             
 def gaussian(x, a, b, c, d=0):
     return a * math.exp(-(x - b)**2 / (2 * c**2)) + d
@@ -14,6 +77,25 @@ def pixel(i, width=100, map=[], spread=2):
     b = sum([gaussian(i, p[1][2], p[0] * width, width/(spread*len(map))) for p in map])
     return min(1.0, r), min(1.0, g), min(1.0, b)
 
+def gradientValues(width=100, map=[], spread=2):
+    """
+    returns pixel(i) for all i in range(width) as an array of shape (width, 3), 
+    the gaussians of all heatmap entries are evaluated as one array expression
+    """
+    x = np.arange(width, dtype=np.float64)
+    if len(map)==0: return np.zeros((width, 3))
+    width = float(width)
+    centers = np.array([p[0] for p in map]) * width
+    colours = np.array([p[1] for p in map])
+    c = width/(spread*len(map))
+    rgb = np.empty((len(x), 3))
+    # evaluated in column bands, so the (heatmap entries x band) weights stay small
+    band = max(1, BAND_SIZE//len(map))
+    for i in range(0, len(x), band):
+        weights = np.exp(-(x[np.newaxis, i:i+band] - centers[:, np.newaxis])**2 / (2 * c**2))
+        rgb[i:i+band] = weights.T @ colours
+    return np.minimum(1.0, rgb)
+
 def get_gradient_2d(start, stop, width, height, is_horizontal):
     if is_horizontal:
         return np.tile(np.linspace(start, stop, width), (height, 1))
@@ -26,36 +108,649 @@ def get_gradient_3d(width, height, start_list, stop_list, is_horizontal_list):
         result[:, :, i] = get_gradient_2d(start, stop, width, height, is_horizontal)
     return result
 
-def getImage(size, plot, gradient):
-    assert plot.any()
+def getImage(size, plot, gradient, frame=0, fractions=None):
+    # only frame is read from plot, which may be memory-mapped (see core.framestore)
+    assert plot.size>0
     assert size
     assert gradient
-    if plot.any() and gradient and size:
+    if plot.size>0 and gradient and size:
         w,h = size
         if len(plot.shape)==3:
-            frameCount, pw, ph = plot.shape
+            _, pw, ph = plot.shape
         elif len(plot.shape)==2:
-            frameCount = 1
             pw, ph = plot.shape
+            plot = plot[np.newaxis]
+            if fractions is not None: fractions = fractions[np.newaxis]
         else:
             return None
-        frames=[]
         s = (w if w<=pw else pw, h if h<ph else ph)
-        for f in range(frameCount):
-            im = Image.new("RGB", s)
-            ld = im.load()
-            for y in range(s[1]):
-                for x in range(s[0]):
-                    v = plot[f,x,y] if len(plot.shape)==3 else plot[x,y]
-                    ld[x,y] = gradient[int(v)]
-            frames.append(im)
-        frames[0].save('animated.gif', format='GIF',
-               append_images=frames[1:], save_all=True, duration=120, loop=0)
-        log.trace(function=getImage, args=plot.shape, returns=(len(frames), frames[0]))
-        return frames[0]
+        if fractions is not None: fractions = fractions[frame, :s[0], :s[1]]
+        pixels = colourize(plot[frame, :s[0], :s[1]], gradientTable(gradient), fractions)
+        im = Image.fromarray(pixels, "RGB")
+        log.trace(function=getImage, args=(plot.shape, frame), returns=im)
+        return im
     else:
         return None
 
+def isIndexable(plot, maxValue, fractions=None):
+    # plots of whole iteration counts that fit in a palette can be stored as palette indices without loss
+    if fractions is not None: return False
+    return maxValue < PALETTE_SIZE and (np.issubdtype(plot.dtype, np.integer) or not np.modf(plot)[0].any())
+
+def getIndexImage(size, plot, frame=0):
+    """
+    returns frame of an indexable plot as a 'P' mode image in which each pixel is its plot value, 
+    so the image can be recoloured by replacing its palette (see getPalette)
+    """
+    w,h = size
+    if len(plot.shape)==2: plot = plot[np.newaxis]
+    frameCount, pw, ph = plot.shape
+    s = (w if w<=pw else pw, h if h<ph else ph)
+    values = np.swapaxes(plot[frame, :s[0], :s[1]], 0, 1)
+    return Image.fromarray(values.astype(np.uint8, order="C"), "P")
+
+def getPalette(gradient):
+    # palette entries beyond the end of the gradient are black
+    palette = np.zeros((PALETTE_SIZE, 3), dtype=np.uint8)
+    lut = gradientTable(gradient)[:PALETTE_SIZE]
+    palette[:len(lut)] = lut
+    return palette.reshape(-1).tolist()
+
+def getFrameCount(plot):
+    return plot.shape[0] if len(plot.shape)==3 else 1
+
+def gradientTable(gradient):
+    # the gradient as a lookup table of RGB bytes, clipped like PIL clips out of range channel values
+    return np.clip(np.array(gradient, dtype=np.int64), 0, 255).astype(np.uint8)
+
+def colourize(plot, lut, fractions=None):
+    """
+    Maps plot values to RGB pixels with a single gather from lut. plot is indexed [..., x, y]
+    like the generated plots, the result is indexed [..., y, x, rgb] as expected by Image.fromarray. 
+    Indexing with the swapped view writes the result in image order, so no transposed copy is made.
+    Smooth plots hold fractional escape values (either in plot or in fractions, see splitValues), 
+    these are blended between adjacent lut entries
+    """
+    values = np.swapaxes(plot, -1, -2)
+    if fractions is None and np.issubdtype(values.dtype, np.integer):
+        return lut[values]
+    i = values.astype(np.intp)
+    t = values - i if fractions is None else np.swapaxes(fractions, -1, -2)
+    if not t.any():
+        return lut[i]
+    lo = lut[i].astype(np.float64)
+    hi = lut[np.minimum(i+1, len(lut)-1)].astype(np.float64)
+    return (lo + t[..., np.newaxis]*(hi - lo)).astype(np.uint8)
+
+def plotDtype(maxIt):
+    # the smallest unsigned integer type that holds the escape counts 0..maxIt-1
+    return np.min_scalar_type(max(maxIt-1, 0))
+
+def splitValues(values):
+    # the whole escape counts and the fractional parts of (smooth) plot values
+    whole = np.floor(values)
+    # keeps the fractions below 1 when they are rounded to FRACTION_DTYPE
+    fractions = np.minimum(values - whole, np.nextafter(FRACTION_DTYPE(1), FRACTION_DTYPE(0)))
+    return (whole, fractions.astype(FRACTION_DTYPE))
+
+def joinValues(counts, fractions=None):
+    # float64 plot values from escape counts and their fractional parts
+    values = counts.astype(np.float64)
+    if fractions is not None: values += fractions
+    return values
+
+def maxPlotValue(counts, fractions=None):
+    # the largest plot value rounded up
+    top = int(counts.max())
+    if fractions is not None and fractions[counts==top].any(): top += 1
+    return top
+
+def compactPlot(plot):
+    """
+    returns (counts, fractions) for a plot of float64 values, as saved before the counts were 
+    compacted: the counts in the smallest type that holds them, fractions None for whole counts
+    """
+    whole, fractions = splitValues(plot)
+    counts = whole.astype(plotDtype(int(whole.max())+1))
+    return (counts, fractions if fractions.any() else None)
+
+def estimateMaxIt(width):
+    # maxIt for an area of the given width, from the number of decimal digits zoomed in
+    digits = max(0.0, math.log10(AUTO_REFERENCE_WIDTH/width)) if width>0 else 0.0
+    return min(AUTO_MAXIT_MAX, int(AUTO_MAXIT_MIN * (1 + digits)**1.5))
+
+def unresolvedPixels(counts, maxIt):
+    # pixels that did not escape next to a pixel that did, the boundary that more iterations may resolve
+    inside = counts>=maxIt-1
+    outside = ~inside
+    edge = np.zeros_like(inside)
+    edge[1:, :] |= outside[:-1, :]
+    edge[:-1, :] |= outside[1:, :]
+    edge[:, 1:] |= outside[:, :-1]
+    edge[:, :-1] |= outside[:, 1:]
+    return np.count_nonzero(inside & edge)
+
+def escapeHistogram(counts, maxIt, bins=AUTO_HISTOGRAM_BINS):
+    # histogram of the escape counts in bins of equal width over [0, maxIt), the pixels that did not escape are counted separately
+    escaped = counts[counts<maxIt-1]
+    histogram, edges = np.histogram(escaped, bins=bins, range=(0, maxIt-1))
+    return {"maxIt": maxIt, "edges": edges.tolist(), "counts": histogram.tolist(), "inside": int(counts.size - escaped.size)}
+
+def strideMask(w, h, stride, x0=0, y0=0):
+    # the pixels of the w x h block at (x0, y0) of a frame that lie on the grid of the given stride
+    mask = np.zeros((w, h), dtype=bool)
+    mask[(-x0)%stride::stride, (-y0)%stride::stride] = True
+    return mask
+
+def mirrorIndex(v):
+    # for every value of the ascending array v the index of its exact negation in v, -1 where there is none
+    j = np.minimum(np.searchsorted(v, -v), len(v)-1)
+    return np.where(v[j]==-v, j, -1)
+
+def mirroredPixels(xs, ys, symmetry):
+    """
+    the pixels of the grid xs x ys whose mirror image under symmetry is exactly another pixel of 
+    the grid, one of every such pair. Pixels are only paired when their coordinates are exact 
+    negations, so a grid that is not aligned with its mirror image (up to a fraction of a pixel) 
+    has no mirrored pixels. Returns (mirrored, sourceX, sourceY): pixel (x, y) with mirrored[x, y] 
+    has the value of pixel (sourceX[x], sourceY[y])
+    """
+    mx, my = mirrorIndex(xs), mirrorIndex(ys)
+    sourceY = np.where(my>=0, my, np.arange(len(ys)))
+    rows = (ys > 0) & (my >= 0)
+    if symmetry==SYMMETRY_CONJUGATE:
+        return (np.ones((len(xs), 1), dtype=bool) & rows[np.newaxis, :], np.arange(len(xs)), sourceY)
+    columns = mx >= 0
+    mirrored = columns[:, np.newaxis] & rows[np.newaxis, :]
+    # the real axis is mirrored onto itself
+    mirrored[:, ys==0] |= (columns & (xs > 0))[:, np.newaxis]
+    return (mirrored, np.where(columns, mx, np.arange(len(xs))), sourceY)
+
+def latticeCoordinates(a, b, n):
+    """
+    n coordinates from a to b on the lattice k*pitch: the pitch (b-a)/(n-1) is rounded to 
+    GRID_PITCH_BITS bits and the first coordinate is snapped to the lattice, around the center 
+    of a to b. Ranges with the same pitch share their coordinates bit for bit where they 
+    overlap, and a lattice holds the exact negation of every coordinate
+    """
+    mantissa, exponent = math.frexp((b - a) / (n - 1))
+    pitch = math.ldexp(round(mantissa * 2**GRID_PITCH_BITS), exponent - GRID_PITCH_BITS)
+    first = round((a + b) / 2 / pitch - (n - 1) / 2)
+    return (np.arange(n) + first) * pitch
+
+def pixelCoordinates(area, size):
+    # float64 pixel coordinates (xs, ys) of area (xa, xb, ya, yb) for a plot of size, on the lattice of its pixel pitch
+    xa,xb,ya,yb = [float(v) for v in area]
+    w,h = size
+    return (latticeCoordinates(xa, xb, w), latticeCoordinates(ya, yb, h))
+
+def gridOffset(old, new):
+    """
+    the offset k such that pixel i of the ascending coordinates old is pixel i+k of new. None 
+    when the grids do not overlap or the shared coordinates are not bit-identical, a pixel 
+    that is off by a rounding error can land on the other side of the set boundary
+    """
+    pitch = new[1] - new[0]
+    k = int(round((old[0] - new[0]) / pitch))
+    i = np.arange(max(0, -k), min(len(old), len(new) - k))
+    if len(i)==0 or not np.array_equal(new[i + k], old[i]): return None
+    return k
+
+def complexType(xs):
+    # complex64 pixels for float32 coordinates, complex128 otherwise
+    return np.complex64 if xs.dtype==np.float32 else np.complex128
+
+def complexGrid(xs, ys):
+    grid = np.empty((len(xs), len(ys)), dtype=complexType(xs))
+    grid.real = xs[:, np.newaxis]
+    grid.imag = ys[np.newaxis, :]
+    return grid
+
+def escapeTime(z, c, maxIt, smooth=False, period=None, stats=None, start=0, final=None):
+    """
+    Vectorized escape time iteration of z = z*z + c over arrays of pixels. 
+    c is either an array with the same shape as z (Mandelbrot) or a scalar (Julia).
+    Returns the iteration counts, identical to those of the scalar loops: the index of 
+    the first iteration at which abs(z) > 2.0, or maxIt-1 for points that never escape.
+    Escaped pixels are dropped from the working set, so the cost per iteration is 
+    proportional to the number of pixels that are still iterating.
+    With smooth=True the result is the continuous (fractional) escape value instead.
+    period=(tolerance, interval) enables the orbit periodicity check of escapeTimePeriodic.
+    An earlier iteration is resumed by passing its final orbit points as z and its maxIt as 
+    start. final, an array shaped like z, receives the orbit points of the pixels that did 
+    not escape when the iteration ends and nan for the pixels that escaped
+    """
+    counts = np.full(z.shape, maxIt-1, dtype=np.float64 if smooth else np.int64)
+    flatCounts = counts.reshape(-1)
+    index = np.arange(z.size)
+    z = z.reshape(-1).copy()
+    c = c.reshape(-1) if isinstance(c, np.ndarray) else c
+    flatFinal = None
+    if final is not None:
+        flatFinal = final.reshape(-1)
+        flatFinal[:] = np.nan
+    if period!=None:
+        tolerance, interval = period
+        tolerance2 = tolerance*tolerance
+        # the saved points are kept for all pixels, so they are only gathered when they are compared
+        saved = z.copy()
+        checkpoint = start + interval
+    for i in range(start, maxIt):
+        done = escaped = np.abs(z) > 2.0
+        anyDone = escaped.any()
+        if anyDone:
+            if smooth:
+                flatCounts[index[escaped]] = smoothEscapeValue(i, z[escaped], c[escaped] if isinstance(c, np.ndarray) else c, maxIt)
+            else:
+                flatCounts[index[escaped]] = i
+        if period!=None and i>start and (i - start)%PERIOD_CHECK_STRIDE==0:
+            # periodic orbits keep the count of points that never escape, the squared distance avoids the square root
+            d = z - saved[index]
+            periodic = (d.real*d.real + d.imag*d.imag < tolerance2) & ~escaped
+            n = np.count_nonzero(periodic)
+            if n>0:
+                if flatFinal is not None: flatFinal[index[periodic]] = z[periodic]
+                addStat(stats, "periodicPixels", n)
+                addStat(stats, "skippedIterations", n*(maxIt-1-i))
+                done = escaped | periodic
+                anyDone = True
+        if anyDone:
+            remaining = ~done
+            index = index[remaining]
+            z = z[remaining]
+            if isinstance(c, np.ndarray): c = c[remaining]
+            if index.size == 0: break
+        if period!=None and i==checkpoint:
+            saved[index] = z
+            interval *= 2
+            checkpoint += interval
+        z = z * z + c
+    if flatFinal is not None: flatFinal[index] = z
+    return counts
+
+def escapeTimePeriodic(z, c, maxIt, tolerance=PERIOD_TOLERANCE, interval=PERIOD_INTERVAL):
+    """
+    scalar escape time with Brent-style cycle detection: z is compared with the orbit point 
+    saved at the last checkpoint, the distance between checkpoints doubles every time.
+    An orbit that returns within tolerance of the saved point is periodic and never escapes.
+    Returns (count, number of iterations skipped)
+    """
+    saved = z
+    checkpoint = interval
+    for i in range(maxIt):
+        if abs(z) > 2.0: return (i, 0)
+        d = z - saved
+        if i>0 and d.real*d.real + d.imag*d.imag < tolerance*tolerance: return (maxIt-1, maxIt-1-i)
+        if i==checkpoint:
+            saved = z
+            interval *= 2
+            checkpoint += interval
+        z = z * z + c
+    return (maxIt-1, 0)
+
+def smoothEscapeValue(i, z, c, maxIt):
+    """
+    continuous escape value mu = i + 2 - log2(log|z|) for points that escaped at iteration i, 
+    z is advanced two more iterations first to reduce the error of the approximation
+    """
+    for n in range(2): z = z * z + c
+    with np.errstate(over='ignore', invalid='ignore'):
+        mu = i + 2 - np.log(np.log(np.abs(z))) / math.log(2.0)
+    mu[~np.isfinite(mu)] = i
+    return np.clip(mu, 0, maxIt-1)
+
+def isInterior(cx, cy):
+    """
+    analytic test for points inside the main cardioid or the period-2 bulb of the Mandelbrot set, 
+    these never escape. Works on scalars as well as arrays
+    """
+    q = (cx - 0.25)**2 + cy*cy
+    cardioid = q * (q + (cx - 0.25)) < 0.25 * cy*cy
+    bulb = (cx + 1.0)**2 + cy*cy < 0.0625
+    return cardioid | bulb
+
+def addStat(stats, key, value):
+    if stats!=None: stats[key] = stats.get(key, 0) + value
+
+def mandelbrotKernel(grid, maxIt, smooth=False, interiorCheck=True, period=None, stats=None, z=None, start=0, final=None):
+    # z, start and final resume an earlier iteration, see escapeTime
+    z = np.zeros_like(grid) if z is None else z
+    if not interiorCheck:
+        return escapeTime(z, grid, maxIt, smooth, period, stats, start, final)
+    interior = isInterior(grid.real, grid.imag)
+    skipped = np.count_nonzero(interior)
+    addStat(stats, "interiorPixels", skipped)
+    if skipped==0:
+        return escapeTime(z, grid, maxIt, smooth, period, stats, start, final)
+    counts = np.full(grid.shape, maxIt-1, dtype=np.float64 if smooth else np.int64)
+    exterior = ~interior
+    c = grid[exterior]
+    exteriorFinal = None if final is None else np.empty(c.shape, dtype=np.complex128)
+    counts[exterior] = escapeTime(z[exterior], c, maxIt, smooth, period, stats, start, exteriorFinal)
+    if final is not None:
+        # interior pixels are resumed from 0, the interior check skips them again
+        final[exterior] = exteriorFinal
+        final[interior] = 0
+    return counts
+
+def juliaKernel(grid, maxIt, smooth=False, c=0j, period=None, stats=None, z=None, start=0, final=None):
+    # z, start and final resume an earlier iteration, see escapeTime
+    return escapeTime(grid if z is None else z, c, maxIt, smooth, period, stats, start, final)
+
+def subdivide(kernel, parameters, xs, ys, stats=None, check=None):
+    """
+    Mariani-Silver subdivision of the grid xs x ys: only the border of a rectangle is computed, 
+    a rectangle with a uniform border is filled with the border value, any other rectangle is 
+    split in four rectangles that share their borders. The borders of all rectangles of one 
+    level are computed in a single kernel call. check() is called before every level.
+    Returns the plot values of the grid
+    """
+    w, h = len(xs), len(ys)
+    values = np.empty((w, h))
+    known = np.zeros((w, h), dtype=bool)
+    rects = [(0, 0, w, h)]
+    filled = 0
+    while len(rects)>0:
+        if check!=None: check()
+        pixels = np.zeros((w, h), dtype=bool)
+        for x0, y0, x1, y1 in rects:
+            if x1-x0<=SUBDIVISION_MIN_SIZE or y1-y0<=SUBDIVISION_MIN_SIZE:
+                pixels[x0:x1, y0:y1] = True
+            else:
+                pixels[x0:x1, y0] = pixels[x0:x1, y1-1] = True
+                pixels[x0, y0:y1] = pixels[x1-1, y0:y1] = True
+        px, py = np.nonzero(pixels & ~known)
+        if len(px)>0:
+            grid = np.empty(len(px), dtype=complexType(xs))
+            grid.real = xs[px]
+            grid.imag = ys[py]
+            values[px, py] = kernel(grid, stats=stats, **parameters)
+            known[px, py] = True
+        nextRects = []
+        for x0, y0, x1, y1 in rects:
+            if x1-x0<=SUBDIVISION_MIN_SIZE or y1-y0<=SUBDIVISION_MIN_SIZE: continue
+            v = values[x0, y0]
+            if (values[x0:x1, y0]==v).all() and (values[x0:x1, y1-1]==v).all() and \
+                (values[x0, y0:y1]==v).all() and (values[x1-1, y0:y1]==v).all():
+                values[x0+1:x1-1, y0+1:y1-1] = v
+                known[x0+1:x1-1, y0+1:y1-1] = True
+                filled += (x1-x0-2)*(y1-y0-2)
+            else:
+                xm, ym = (x0+x1)//2, (y0+y1)//2
+                nextRects += [(x0, y0, xm+1, ym+1), (xm, y0, x1, ym+1), (x0, ym, xm+1, y1), (xm, ym, x1, y1)]
+        rects = nextRects
+    addStat(stats, "filledPixels", filled)
+    return values
+
+def toDecimal(v):
+    # floats are converted by their shortest repr, so 0.05 becomes Decimal('0.05')
+    if isinstance(v, (Decimal, int, str)): return Decimal(v)
+    return Decimal(repr(float(v)))
+
+def decimalContext(width):
+    """
+    returns a context manager for decimal arithmetic on coordinates of an area of the given 
+    width, with REFERENCE_DIGITS significant digits below the width
+    """
+    ctx = getcontext().copy()
+    ctx.prec = max(ctx.prec, REFERENCE_DIGITS + max(0, -toDecimal(width).adjusted()) + 1)
+    return localcontext(ctx)
+
+def referenceOrbit(c, maxIt, width):
+    """
+    iterates z = z*z + c in decimal arithmetic for the reference point c = (cr, ci) of an area 
+    of the given width. Returns the orbit rounded to complex128, up to and including the 
+    first point that escapes
+    """
+    cr, ci = c
+    orbit = np.empty(maxIt, dtype=np.complex128)
+    with decimalContext(width):
+        zr = zi = Decimal(0)
+        four = Decimal(4)
+        for n in range(maxIt):
+            orbit[n] = complex(float(zr), float(zi))
+            zr2, zi2 = zr*zr, zi*zi
+            if zr2 + zi2 > four: return orbit[:n+1]
+            zr, zi = zr2 - zi2 + cr, 2*zr*zi + ci
+    return orbit
+
+def twoSum(a, b):
+    # a + b as the float64 sum and its rounding error
+    s = a + b
+    v = s - a
+    return s, (a - (s - v)) + (b - v)
+
+def quickTwoSum(a, b):
+    # same as twoSum, for |a| >= |b|
+    s = a + b
+    return s, b - (s - a)
+
+def splitDouble(a):
+    # splits the 53 bit mantissa of a in two halves of 26 bits
+    t = 134217729.0 * a
+    hi = t - (t - a)
+    return hi, a - hi
+
+def twoProd(a, b):
+    # a * b as the float64 product and its rounding error
+    p = a * b
+    ah, al = splitDouble(a)
+    bh, bl = splitDouble(b)
+    return p, ((ah*bh - p) + ah*bl + al*bh) + al*bl
+
+def ddAdd(ah, al, bh, bl):
+    # sum of the double-double values (ah, al) and (bh, bl), the low parts are added with
+    # twoSum as well, so the sum stays accurate when rr - ii cancels
+    s, e = twoSum(ah, bh)
+    t, f = twoSum(al, bl)
+    s, e = quickTwoSum(s, e + t)
+    return quickTwoSum(s, e + f)
+
+def ddMul(ah, al, bh, bl):
+    # product of the double-double values (ah, al) and (bh, bl)
+    p, e = twoProd(ah, bh)
+    return quickTwoSum(p, e + ah*bl + al*bh)
+
+def toDoubleDouble(v):
+    # the Decimal v as (hi, lo) float64 pair
+    hi = float(v)
+    with decimalContext(0):
+        return (hi, float(v - Decimal(hi)))
+
+def ddEscapeTime(z, c, maxIt, smooth=False):
+    """
+    escapeTime in double-double arithmetic. z = (zr, zrLo, zi, ziLo) are arrays of the real and 
+    imaginary parts of the pixels as double-double values, c is given the same way, either as 
+    arrays (Mandelbrot) or as scalars (Julia). The escape test uses the high parts
+    """
+    zr, zrl, zi, zil = [np.broadcast_to(v, z[0].shape).reshape(-1).copy() for v in z]
+    counts = np.full(z[0].shape, maxIt-1, dtype=np.float64 if smooth else np.int64)
+    flatCounts = counts.reshape(-1)
+    index = np.arange(zr.size)
+    c = [v.reshape(-1) if isinstance(v, np.ndarray) else v for v in c]
+    for i in range(maxIt):
+        escaped = zr*zr + zi*zi > 4.0
+        if escaped.any():
+            if smooth:
+                ce = complex(c[0], c[2]) if not isinstance(c[0], np.ndarray) else c[0][escaped] + 1j*c[2][escaped]
+                flatCounts[index[escaped]] = smoothEscapeValue(i, zr[escaped] + 1j*zi[escaped], ce, maxIt)
+            else:
+                flatCounts[index[escaped]] = i
+            remaining = ~escaped
+            index = index[remaining]
+            if index.size == 0: break
+            zr, zrl, zi, zil = zr[remaining], zrl[remaining], zi[remaining], zil[remaining]
+            c = [v[remaining] if isinstance(v, np.ndarray) else v for v in c]
+        rr, rrl = ddMul(zr, zrl, zr, zrl)
+        ii, iil = ddMul(zi, zil, zi, zil)
+        ri, ril = ddMul(zr, zrl, zi, zil)
+        zr, zrl = ddAdd(*ddAdd(rr, rrl, -ii, -iil), c[0], c[1])
+        zi, zil = ddAdd(2*ri, 2*ril, c[2], c[3])
+    return counts
+
+def ddMandelbrotKernel(grid, maxIt, center, smooth=False, stats=None):
+    # grid holds the offsets of the pixels from center = (cr, crLo, ci, ciLo)
+    cr = ddAdd(center[0], center[1], grid.real, 0.0)
+    ci = ddAdd(center[2], center[3], grid.imag, 0.0)
+    zero = np.zeros(grid.shape)
+    return ddEscapeTime((zero, zero, zero, zero), (cr[0], cr[1], ci[0], ci[1]), maxIt, smooth)
+
+def ddJuliaKernel(grid, maxIt, center, c=0j, smooth=False, stats=None):
+    # grid holds the offsets of the pixels from center = (zr, zrLo, zi, ziLo)
+    zr = ddAdd(center[0], center[1], grid.real, 0.0)
+    zi = ddAdd(center[2], center[3], grid.imag, 0.0)
+    return ddEscapeTime((zr[0], zr[1], zi[0], zi[1]), (c.real, 0.0, c.imag, 0.0), maxIt, smooth)
+
+def seriesApproximation(orbit, radius, pitch, terms=SERIES_TERMS, tolerance=SERIES_TOLERANCE, probes=None, probeTolerance=SERIES_PROBE_TOLERANCE):
+    """
+    approximates the offsets from the reference orbit of all pixels within radius of the 
+    reference point by a polynomial in dc: dz = a[0]*dc + a[1]*dc**2 + ... + a[terms-1]*dc**terms.
+    The coefficients are advanced along the orbit as long as the last term stays below tolerance 
+    times the difference between the offsets of neighbouring pixels (a[0]*pitch), and as long 
+    as no pixel can escape or be rebased. 
+    The last term does not bound the error of the series, so the approximation is checked at the 
+    offsets probes (e.g. the corners and edge midpoints of the frame) against plain perturbation 
+    (see perturbationOrbit). The number of skipped iterations is halved until the error at every 
+    probe is below probeTolerance times a[0]*pitch. Returns (n, a): the iteration the pixels can 
+    start from and the coefficients of their offsets at that iteration
+    """
+    a = [0j] * terms
+    coefficients = [a]
+    for n in range(len(orbit)-1):
+        Z = complex(orbit[n])
+        spread = sum(abs(a[k]) * radius**(k+1) for k in range(terms))
+        if abs(Z) + spread > 2.0 or abs(Z) < 2*spread: break
+        b = [2*Z*a[0] + 1]
+        for k in range(1, terms):
+            b.append(2*Z*a[k] + sum(a[j]*a[k-1-j] for j in range(k)))
+        if not all(cmath.isfinite(v) for v in b): break
+        if abs(b[-1]) * radius**terms > tolerance * abs(b[0]) * pitch: break
+        a = b
+        coefficients.append(a)
+    n = len(coefficients) - 1
+    if probes is None or n==0: return (n, a)
+    probes = np.asarray(probes, dtype=np.complex128)
+    offsets = perturbationOffsets(orbit, probes, n)
+    while n>0:
+        a = coefficients[n]
+        dz = np.zeros_like(probes)
+        for ak in reversed(a): dz = (dz + ak) * probes
+        # nan (a rebased probe) fails the comparison
+        with np.errstate(invalid='ignore', over='ignore'):
+            if np.all(np.abs(dz - offsets[n]) <= probeTolerance * abs(a[0]) * pitch): break
+        n //= 2
+    return (n, coefficients[n])
+
+def perturbationOffsets(orbit, dc, n):
+    """
+    the offsets dz from the reference orbit of the pixels dc in the first n iterations of 
+    perturbationKernel, shape (n+1, len(dc)). nan from the iteration at which a pixel is 
+    rebased or escapes, where its offset no longer follows the reference orbit
+    """
+    offsets = np.full((n+1, len(dc)), np.nan, dtype=np.complex128)
+    dz = np.zeros_like(dc)
+    with np.errstate(invalid='ignore', over='ignore'):
+        for i in range(min(n+1, len(orbit))):
+            z = orbit[i] + dz
+            following = ~((np.abs(z) < np.abs(dz)) | (np.abs(z) > 2.0))
+            if not following.all(): dz = np.where(following, dz, np.nan)
+            offsets[i] = dz
+            dz = 2*orbit[i]*dz + dz*dz + dc
+    return offsets
+
+def perturbationKernel(grid, maxIt, orbit, c=0j, smooth=False, series=None, stats=None):
+    """
+    Mandelbrot escape time for pixels given as offsets dc (grid) from the reference point c
+    of orbit. Only the offsets dz = z - Z from the reference orbit Z are iterated in float64:
+    dz = 2*Z*dz + dz*dz + dc. A pixel is rebased onto the start of the reference orbit 
+    (dz = z, Z = 0) when z gets closer to 0 than dz, where dz would lose its precision and 
+    the pixel would glitch, and when the pixel outlives the reference orbit.
+    series=(n, a) as returned by seriesApproximation starts all pixels at iteration n.
+    Counts are those of escapeTime
+    """
+    counts = np.full(grid.shape, maxIt-1, dtype=np.float64 if smooth else np.int64)
+    flatCounts = counts.reshape(-1)
+    index = np.arange(grid.size)
+    dc = grid.reshape(-1).copy()
+    dz = np.zeros_like(dc)
+    m = np.zeros(dc.size, dtype=np.intp)
+    last = len(orbit) - 1
+    rebases = 0
+    start = 0
+    if series!=None:
+        start, a = series
+        for ak in reversed(a): dz = (dz + ak) * dc
+        m[:] = start
+        addStat(stats, "seriesSkippedIterations", start*dc.size)
+    for i in range(start, maxIt):
+        Z = orbit[m]
+        z = Z + dz
+        az = np.abs(z)
+        escaped = az > 2.0
+        if escaped.any():
+            if smooth:
+                flatCounts[index[escaped]] = smoothEscapeValue(i, z[escaped], c + dc[escaped], maxIt)
+            else:
+                flatCounts[index[escaped]] = i
+            remaining = ~escaped
+            index = index[remaining]
+            if index.size == 0: break
+            dc, dz, m, Z, z, az = dc[remaining], dz[remaining], m[remaining], Z[remaining], z[remaining], az[remaining]
+        rebase = (az < np.abs(dz)) | (m == last)
+        if rebase.any():
+            dz[rebase] = z[rebase]
+            Z[rebase] = 0
+            m[rebase] = 0
+            rebases += np.count_nonzero(rebase)
+        dz = 2*Z*dz + dz*dz + dc
+        m += 1
+    addStat(stats, "rebases", rebases)
+    return counts
+
+def renderTile(kernel, parameters, xs, ys, target, frame, x0, y0, subdivided=False, skip=None, keepState=False, fractionsTarget=None):
+    """
+    runs in a worker process: computes a single tile and writes it straight into the 
+    shared plot array identified by target (shared memory name, shape, dtype).
+    fractionsTarget (shared memory name) identifies the array of the fractional parts of a 
+    smooth plot, shaped like the plot array.
+    The pixels on the grid of stride skip are already in the plot array and are not computed.
+    With keepState, the final orbit points of the computed pixels that did not escape (see 
+    escapeTime) are returned as (index in the frame, z), None otherwise
+    """
+    name, shape, dtype = target
+    shm = shared_memory.SharedMemory(name=name)
+    finals = None
+    fractionsShm = None if fractionsTarget==None else shared_memory.SharedMemory(name=fractionsTarget)
+    stats = {}
+    try:
+        plot = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        fractions = None if fractionsShm==None else np.ndarray(shape, dtype=FRACTION_DTYPE, buffer=fractionsShm.buf)
+        tile = (frame, slice(x0, x0+len(xs)), slice(y0, y0+len(ys)))
+        if subdivided:
+            counts = subdivide(kernel, parameters, xs, ys, stats)
+            size = counts.size
+        else:
+            counts = joinValues(plot[tile], None if fractions is None else fractions[tile])
+            todo = np.ones(counts.shape, dtype=bool) if skip==None else ~strideMask(len(xs), len(ys), skip, x0, y0)
+            state = {"final": np.empty(np.count_nonzero(todo), dtype=np.complex128)} if keepState else {}
+            counts[todo] = kernel(complexGrid(xs, ys)[todo], stats=stats, **parameters, **state)
+            size = np.count_nonzero(todo)
+            if xs.dtype==np.float32: addStat(stats, "float32Pixels", size)
+            if keepState:
+                px, py = np.nonzero(todo)
+                kept = ~np.isnan(state["final"])
+                finals = ((px[kept] + x0)*shape[2] + py[kept] + y0, state["final"][kept])
+        if fractions is None:
+            plot[tile] = counts
+        else:
+            plot[tile], fractions[tile] = splitValues(counts)
+        tileMax = int(math.ceil(counts.max()))
+        del plot, fractions
+    finally:
+        shm.close()
+        if fractionsShm!=None: fractionsShm.close()
+    return (size, tileMax, stats, finals)
+
 def default_image(w=150, h=150):
     array = get_gradient_3d(w, h, (0, 0, 192), (255, 255, 64), (True, False, False))
     return Image.fromarray(np.uint8(array))
@@ -71,48 +766,32 @@ class Source:
         mw,mh = heatmapBaseImageSize
         self.heatmapBaseImage = self.__sourceImage__.resize((sw if sw<mw else mw, sh if sh<mh else mh))
         self.heatmap = []
-        color_count = {}
         img = self.heatmapBaseImage
         w, h = img.size
-        # iterate through each pixel in the image and keep a count per unique color
-        for x in range(w):
-            for y in range(h):
-                rgb = img.getpixel((x, y))
-                if rgb in color_count:
-                    color_count[rgb] += 1
-                else:
-                    color_count[rgb] = 1
+        # count the pixels per unique color, colors are packed into one integer so they sort as (r,g,b) tuples
+        rgb = np.asarray(img, dtype=np.uint32).reshape(-1, 3)
+        colors, counts = np.unique((rgb[:,0]<<16) | (rgb[:,1]<<8) | rgb[:,2], return_counts=True)
         
         t = w * h
-        total_steps = len(color_count)
+        total_steps = len(colors)
+        # cumsum adds sequentially, so the steps are identical to accumulating them one by one
+        steps = np.cumsum(counts*(1+1/total_steps)/t)
         step = 0.0
-        for c in sorted(color_count):
-            n = color_count[c]
-            r,g,b = c
+        for c, nextStep in zip(colors.tolist(), steps.tolist()):
+            r,g,b = c>>16, (c>>8)&0xff, c&0xff
             mapping = [round(step, 3), (round(r/255, 3), round(g/255, 3), round(b/255, 3))]
-            #print(mapping)
             self.heatmap.append(mapping)
-            step+=n*(1+1/total_steps)/t
+            step = nextStep
 
         self.createGradientImage()
 
     def createGradientImage(self):
         w,h = self.__sourceImage__.size
-        im = Image.new('RGB', (w,1))
-        ld = im.load()
-        for x in range(w):
-            r, g, b = pixel(x, width=w, map=self.heatmap)
-            r, g, b = [int(256*v) for v in (r, g, b)]
-            ld[x, 0] = r, g, b
-        self.gradientImage = im
+        values = np.clip(self.getGradientPixels(w), 0, 255).astype(np.uint8)
+        self.gradientImage = Image.fromarray(values[np.newaxis], "RGB")
 
     def getGradientPixels(self, w, reverse=False):
-        pixels = []
-        for i in range(w):
-            r, g, b = pixel(w-i-1 if reverse else i, width=w, map=self.heatmap)
-            r, g, b = [int(256*v) for v in (r, g, b)]
-            pixels.append((r,g,b))
-        return pixels
+        return list(gradientPixels(tuple((p[0], tuple(p[1])) for p in self.heatmap), w, reverse))
 
     def getSourceImage(self):
         return self.__sourceImage__
@@ -123,35 +802,631 @@ class Source:
     def getHeatmapBaseImage(self):
         return self.heatmapBaseImage
 
+@functools.lru_cache(maxsize=GRADIENT_CACHE_SIZE)
+def gradientPixels(heatmap, w, reverse=False):
+    values = (256*gradientValues(w, map=heatmap)).astype(int)
+    if reverse: values = values[::-1]
+    return tuple(map(tuple, values.tolist()))
+
+class GenerationCancelled(Exception):
+    pass
+
+class CancelToken:
+    """
+    Shared between the event loop and the thread that runs FractalGenerator.plot. 
+    Cancelling the token makes the generator raise GenerationCancelled at its next check
+    """
+    def __init__(self):
+        self.__cancelled = threading.Event()
+
+    def cancel(self):
+        self.__cancelled.set()
+
+    def isCancelled(self):
+        return self.__cancelled.is_set()
+
+    def check(self):
+        if self.isCancelled(): raise GenerationCancelled()
+
 class FractalGenerator:
     def __init__(self, source, size=(512,512)):
         self.source = source
         self.size = size
         self.image = None
+        self.vectorized = True
+        self.smooth = False
+        self.workers = os.cpu_count() or 1
+        self.tileSize = TILE_SIZE
+        self.cancelToken = None
+        self.subdivide = False
+        self.progressive = False
+        # kernels of a compute backend, keyed by the kernel they replace (see core.backends)
+        self.kernels = {}
+        # names of the parameters given to setup, setDefaults leaves them alone
+        self.explicitParameters = frozenset()
+        # None selects double-double arithmetic automatically from the pixel pitch, True or False forces it
+        self.doubleDouble = None
+        # float32 arithmetic is opt-in as it moves the counts of pixels close to the set boundary: 
+        # None selects it automatically for shallow areas, True forces it
+        self.float32 = False
+        # computes only one of every two pixels that are exact mirror images (see getMirror)
+        self.symmetry = True
+        self.periodicityCheck = False
+        self.periodTolerance = PERIOD_TOLERANCE
+        self.periodInterval = PERIOD_INTERVAL
+        # keeps the final orbit points of the pixels that did not escape in state, so a render 
+        # of the same frame with a higher maxIt can resume them (see canResume)
+        self.keepState = False
+        self.state = None
+        self.resumePlot = None
+        self.resumeState = None
+        # chunks (flat pixel index, final z) of the kept orbit points of the frame being plotted
+        self.finals = None
+        # the grid (key, area) of the last single frame plot, see getGridKey. A plot whose grid 
+        # (reuseGrid) has the same key and shares bit-identical pixel coordinates with the current 
+        # frame has the pixels they share copied from reusePlot (and reuseFractions), see canReuse
+        self.grid = None
+        self.reuseGrid = None
+        self.reusePlot = None
+        self.reuseFractions = None
+        # chooses maxIt for single frames from the zoom depth and a probe render (see chooseMaxIt)
+        self.autoMaxIt = False
+        self.escapeHistogram = None
+        # escape counts of the last plot (see plotDtype), and the fractional parts of its values 
+        # when it is smooth (see splitValues)
+        self.plotValues = None
+        self.plotFractions = None
+        self.resumeFractions = None
+        # allocates plotValues and plotFractions as files instead of in memory, and writes 
+        # every frame to them when it is finished (see core.framestore)
+        self.frameStore = None
+        self.stats = {}
 
     def setup(self, **parameters):
         for k in parameters.keys():
             if hasattr(self, k):
                 setattr(self, k, parameters[k])
+        self.explicitParameters = self.explicitParameters | parameters.keys()
+
+    def setDefaults(self, **parameters):
+        # sets the parameters that were not given to setup, e.g. the settings of a compute backend
+        for k in parameters.keys():
+            if hasattr(self, k) and not k in self.explicitParameters:
+                setattr(self, k, parameters[k])
 
-    def plot(self, progressHandler=None):
+    def plot(self, progressHandler=None, passHandler=None):
         if self.areas==None and self.area!=None:
             self.areas=[self.area]
         n = len(self.areas)
         w,h = self.size
-        self.plotValues = np.empty((n,w,h))
         self.i_max = 0
-        for f in range(n):
-            self.area = self.areas[f]
-            self.plotFrame(progressHandler, n, f)
+        self.stats = {}
+        if n==1: self.area = self.areas[0]
+        self.escapeHistogram = None
+        if self.autoMaxIt and n==1: self.maxIt = self.chooseMaxIt()
+        self.state = None
+        self.finals = [] if self.keepsState() else None
+        if self.canResume():
+            self.plotResumed(progressHandler)
+        elif self.canReuse():
+            self.plotReused(progressHandler)
+        elif self.useProgressive():
+            self.plotProgressive(progressHandler, passHandler)
+        elif self.useTiles() and self.frameStore==None:
+            self.plotTiles(progressHandler)
+        else:
+            self.allocatePlot(n)
+            executor = None
+            try:
+                for f in range(n):
+                    self.checkCancelled()
+                    self.area = self.areas[f]
+                    if self.useTiles():
+                        # the tiles of a frame store are rendered frame by frame on one pool of workers, 
+                        # the shared memory holds one frame
+                        if executor==None: executor = ProcessPoolExecutor(max_workers=self.workers)
+                        self.plotTiles(progressHandler, frames=range(f, f+1), executor=executor)
+                    elif self.useSubdivision():
+                        self.plotSubdivided(progressHandler, n, f)
+                    else:
+                        self.plotFrame(progressHandler, n, f)
+                    if self.frameStore!=None: self.frameStore.flush()
+            finally:
+                if executor!=None: executor.shutdown(cancel_futures=True)
+        if self.finals is not None:
+            index, z = self.collectFinals()
+            self.state = (self.getStateKey(), self.maxIt, index.astype(np.min_scalar_type(w*h)), z)
+            self.finals = None
+        self.grid = (self.getGridKey(), self.area) if n==1 else None
         return (self.plotValues, self.i_max)
 
+    def checkCancelled(self):
+        if self.cancelToken!=None: self.cancelToken.check()
+
+    def allocatePlot(self, n):
+        w,h = self.size
+        if self.frameStore!=None:
+            self.plotValues, self.plotFractions = self.frameStore.allocate((n,w,h), plotDtype(self.maxIt), self.smooth)
+            return
+        self.plotValues = np.zeros((n,w,h), dtype=plotDtype(self.maxIt))
+        self.plotFractions = np.zeros((n,w,h), dtype=FRACTION_DTYPE) if self.smooth else None
+
+    def storeValues(self, index, values):
+        # stores plot values at index of plotValues, the fractional parts of smooth values in plotFractions
+        if self.plotFractions is None:
+            self.plotValues[index] = values
+        else:
+            self.plotValues[index], self.plotFractions[index] = splitValues(values)
+
     def plotFrame(self, progressHandler=None):
         pass
+
+    def addStats(self, stats):
+        # stats counts the work saved during the current render, e.g. stats["interiorPixels"]
+        for k in stats.keys(): addStat(self.stats, k, stats[k])
+
+    def getPeriod(self):
+        # parameters of the orbit periodicity check, None when it is disabled
+        return (self.periodTolerance, self.periodInterval) if self.periodicityCheck else None
+
+    def getKernel(self):
+        """
+        returns (kernel, parameters) for the vectorized and tiled code paths, where 
+        kernel(grid, stats=None, **parameters) computes the plot values for an array of pixel 
+        coordinates and adds its counters to the stats dict.
+        kernel must be a module level function so it can be sent to worker processes
+        """
+        return (None, {})
+
+    def runKernel(self, kernel, parameters, grid, frame, px, py):
+        # computes the pixels (px, py) of frame, keeping their final orbit points when the state is kept
+        if grid.dtype==np.complex64: addStat(self.stats, "float32Pixels", grid.size)
+        if self.finals is None:
+            return kernel(grid, stats=self.stats, **parameters)
+        final = np.empty(grid.shape, dtype=np.complex128)
+        counts = kernel(grid, stats=self.stats, final=final, **parameters)
+        self.keepFinals(px, py, final)
+        return counts
+
+    def keepFinals(self, px, py, final):
+        # keeps the final orbit points of the pixels (px, py) that did not escape (final is not nan)
+        px, py, final = (a.reshape(-1) for a in np.broadcast_arrays(px, py, final))
+        kept = ~np.isnan(final)
+        self.finals.append((np.ravel_multi_index((px[kept], py[kept]), self.size), final[kept]))
+
+    def collectFinals(self):
+        # the kept orbit points as one chunk sorted by pixel index
+        if len(self.finals)!=1:
+            index = np.concatenate([np.empty(0, dtype=np.intp)] + [i for i, z in self.finals])
+            z = np.concatenate([np.empty(0, dtype=np.complex128)] + [z for i, z in self.finals])
+            order = np.argsort(index, kind="stable")
+            self.finals = [(index[order], z[order])]
+        return self.finals[0]
+
+    def getFinals(self, index):
+        # the kept orbit points of the pixels at the flat indices index, nan for pixels without one
+        kept, z = self.collectFinals()
+        if len(kept)==0: return np.full(len(index), np.nan, dtype=np.complex128)
+        i = np.minimum(np.searchsorted(kept, index), len(kept) - 1)
+        return np.where(kept[i]==index, z[i], np.nan)
+
+    def getStateKey(self):
+        # everything apart from maxIt that the iteration state of a frame depends on
+        return repr((tuple(str(v) for v in self.area), tuple(self.size), self.smooth))
+
+    def getGridKey(self):
+        # everything apart from the area and size that the plot values depend on
+        kernel = self.getKernel()[0]
+        return repr((self.maxIt, self.smooth, None if kernel==None else kernel.__qualname__, self.vectorized, 
+            self.subdivide, self.periodicityCheck, self.periodTolerance, self.periodInterval, self.float32))
+
+    def keepsState(self):
+        # only the float64 kernels continue from a kept state, the state of a single frame is kept
+        return (self.keepState and len(self.areas)==1 and (self.vectorized or self.smooth) 
+            and not self.useOffsets() and self.getKernel()[0]!=None)
+
+    def canResume(self):
+        # resumeState is the state of resumePlot (and resumeFractions), a render of the same frame with a lower maxIt
+        if self.resumeState==None or self.resumePlot is None or not self.keepsState(): return False
+        key, maxIt, index, z = self.resumeState
+        return key==self.getStateKey() and maxIt<self.maxIt
+
+    def plotResumed(self, progressHandler=None):
+        """
+        continues the pixels of resumePlot that had not escaped from their kept orbit points, 
+        the pixels that escaped keep their values. Smooth values that were clipped to the old 
+        maxIt-1 are computed again
+        """
+        key, maxIt, index, z = self.resumeState
+        log.debug(function=self.plotResumed, args=(maxIt, self.maxIt, len(index)))
+        kernel, parameters = self.getKernel()
+        xs, ys = self.getPixelCoordinates()
+        w,h = self.size
+        self.allocatePlot(1)
+        self.plotValues[:] = np.reshape(self.resumePlot, (1,w,h))
+        if self.plotFractions is not None and self.resumeFractions is not None:
+            self.plotFractions[:] = np.reshape(self.resumeFractions, (1,w,h))
+        px, py = np.unravel_index(index.astype(np.intp), (w,h))
+        for i in range(0, len(index), BAND_SIZE):
+            self.checkCancelled()
+            bx, by = px[i:i+BAND_SIZE], py[i:i+BAND_SIZE]
+            resume = dict(parameters, z=z[i:i+BAND_SIZE], start=maxIt)
+            self.storeValues((0, bx, by), self.runKernel(kernel, resume, xs[bx] + 1j*ys[by], 0, bx, by))
+            if progressHandler!=None: progressHandler(self, int(min(len(index), i+BAND_SIZE)*100/len(index)))
+        if self.plotFractions is not None:
+            # smooth values are clipped to maxIt-1, the pixels that escaped close to the old limit are computed again
+            clipped = (self.plotValues[0]==maxIt-1) & (self.plotFractions[0]==0)
+            clipped[px, py] = False
+            cx, cy = np.nonzero(clipped)
+            if len(cx)>0: self.storeValues((0, cx, cy), self.runKernel(kernel, parameters, xs[cx] + 1j*ys[cy], 0, cx, cy))
+        addStat(self.stats, "resumedPixels", len(index))
+        self.i_max = maxPlotValue(self.plotValues, self.plotFractions)
+
+    def getReuseOffset(self):
+        # the offsets (kx, ky) of the pixels of reusePlot in the grid of the current frame, None when the grids do not line up
+        key, area = self.reuseGrid
+        w,h = np.shape(self.reusePlot)[1:]
+        xs, ys = pixelCoordinates(area, (w,h))
+        nxs, nys = self.getPixelCoordinates()
+        kx, ky = gridOffset(xs, nxs), gridOffset(ys, nys)
+        return None if kx==None or ky==None else (kx, ky)
+
+    def canReuse(self):
+        # only single float64 frames without subdivision, reusePlot must be a single frame rendered with the same key
+        if self.reuseGrid==None or self.reusePlot is None or len(self.areas)!=1: return False
+        if self.reuseGrid[0]!=self.getGridKey() or np.shape(self.reusePlot)[0]!=1: return False
+        if self.useOffsets() or self.useSubdivision() or self.getKernel()[0]==None: return False
+        return self.getReuseOffset()!=None
+
+    def plotReused(self, progressHandler=None):
+        """
+        copies the pixels that reusePlot shares with the grid of the current frame (a panned or 
+        resized view) and computes only the pixels it does not cover. When the state is kept, 
+        the kept orbit points of the shared pixels are taken from resumeState, the state of 
+        reusePlot, and the state is dropped when it has none
+        """
+        kx, ky = self.getReuseOffset()
+        kernel, parameters = self.getKernel()
+        xs, ys = self.toPrecision(*self.getPixelCoordinates())
+        w,h = self.size
+        ow, oh = np.shape(self.reusePlot)[1:]
+        log.debug(function=self.plotReused, args=((ow,oh), (w,h), kx, ky))
+        self.allocatePlot(1)
+        new = (0, slice(max(0, kx), min(w, ow + kx)), slice(max(0, ky), min(h, oh + ky)))
+        old = (0, slice(max(0, -kx), min(ow, w - kx)), slice(max(0, -ky), min(oh, h - ky)))
+        self.plotValues[new] = self.reusePlot[old]
+        if self.plotFractions is not None and self.reuseFractions is not None:
+            self.plotFractions[new] = self.reuseFractions[old]
+        if self.finals is not None:
+            if self.resumeState!=None and self.resumeState[1]==self.maxIt:
+                key, maxIt, index, z = self.resumeState
+                px, py = np.unravel_index(index.astype(np.intp), (ow,oh))
+                px, py = px + kx, py + ky
+                inside = (px>=0) & (px<w) & (py>=0) & (py<h)
+                self.keepFinals(px[inside], py[inside], z[inside])
+            else:
+                self.finals = None
+        todo = np.ones((w,h), dtype=bool)
+        todo[new[1:]] = False
+        px, py = np.nonzero(todo)
+        for i in range(0, len(px), BAND_SIZE):
+            self.checkCancelled()
+            bx, by = px[i:i+BAND_SIZE], py[i:i+BAND_SIZE]
+            self.storeValues((0, bx, by), self.runKernel(kernel, parameters, xs[bx] + 1j*ys[by], 0, bx, by))
+            if progressHandler!=None: progressHandler(self, int(min(len(px), i+BAND_SIZE)*100/len(px)))
+        addStat(self.stats, "reusedPixels", w*h - len(px))
+        self.i_max = maxPlotValue(self.plotValues, self.plotFractions)
+
+    def chooseMaxIt(self):
+        """
+        estimates maxIt from the width of the area, then renders the area at low resolution and 
+        doubles maxIt while the fraction of unresolved boundary pixels (see unresolvedPixels) 
+        stays above AUTO_UNRESOLVED_FRACTION and doubling still resolves enough of them. The probe 
+        resumes its pixels at every step where it can. The escape histogram of the last probe is 
+        kept in escapeHistogram
+        """
+        w,h = self.size
+        scale = min(1.0, AUTO_PROBE_SIZE/max(w,h))
+        probe = copy.copy(self)
+        probe.setup(size=(max(2, int(w*scale)), max(2, int(h*scale))), areas=[self.area], autoMaxIt=False, 
+            keepState=True, resumePlot=None, resumeFractions=None, resumeState=None, reuseGrid=None, progressive=False, workers=1)
+        maxIt = max(AUTO_MAXIT_MIN, estimateMaxIt(float(abs(toDecimal(self.area[1]) - toDecimal(self.area[0])))))
+        probe.setup(maxIt=maxIt)
+        counts, _ = probe.plot()
+        unresolved = unresolvedPixels(counts[0], maxIt)
+        histogram = escapeHistogram(counts, maxIt)
+        while unresolved > AUTO_UNRESOLVED_FRACTION*counts.size and maxIt*2 <= AUTO_MAXIT_MAX:
+            probe.setup(maxIt=maxIt*2, resumePlot=counts, resumeFractions=probe.plotFractions, resumeState=probe.state)
+            nextCounts, _ = probe.plot()
+            nextUnresolved = unresolvedPixels(nextCounts[0], maxIt*2)
+            if unresolved - nextUnresolved < AUTO_MIN_GAIN*unresolved: break
+            maxIt, counts, unresolved = maxIt*2, nextCounts, nextUnresolved
+            histogram = escapeHistogram(counts, maxIt)
+        self.escapeHistogram = dict(histogram, unresolved=unresolved/counts.size)
+        log.debug(function=self.chooseMaxIt, returns=(maxIt, self.escapeHistogram["unresolved"]))
+        return maxIt
+
+    def getSymmetry(self):
+        # the symmetry of the fractal (SYMMETRY_CONJUGATE or SYMMETRY_POINT), None when it has none
+        return None
+
+    def getMirror(self, xs, ys):
+        """
+        the pixels of the grid xs x ys of the current frame that are filled from their mirror 
+        images, as returned by mirroredPixels, or None. Subdivision fills rectangles without 
+        computing them, its values are not symmetric
+        """
+        symmetry = self.getSymmetry()
+        if not self.symmetry or symmetry==None or self.useSubdivision(): return None
+        mirror = mirroredPixels(xs, ys, symmetry)
+        return mirror if mirror[0].any() else None
+
+    def fillMirrored(self, frame, mirror, pixels=None):
+        # copies the values and kept orbit points of the mirrored pixels (only those in pixels) from their mirror images
+        mirrored, sourceX, sourceY = mirror
+        px, py = np.nonzero(mirrored if pixels is None else mirrored & pixels)
+        sx, sy = sourceX[px], sourceY[py]
+        self.plotValues[frame, px, py] = self.plotValues[frame, sx, sy]
+        if self.plotFractions is not None: self.plotFractions[frame, px, py] = self.plotFractions[frame, sx, sy]
+        if self.finals is not None:
+            z = self.getFinals(np.ravel_multi_index((sx, sy), self.size))
+            self.keepFinals(px, py, np.conj(z) if self.getSymmetry()==SYMMETRY_CONJUGATE else z)
+        addStat(self.stats, "mirroredPixels", len(px))
+
+    def useSubdivision(self):
+        # subdivision fills pixels without iterating them, they have no state to keep
+        return self.subdivide and self.getKernel()[0]!=None and not self.keepsState()
+
+    def plotSubdivided(self, progressHandler=None, n=1, frame=0):
+        # renders the current frame with the Mariani-Silver subdivision (see subdivide)
+        log.debug(function=self.plotSubdivided, args=(n,frame))
+        kernel, parameters = self.getKernel()
+        xs, ys = self.toPrecision(*self.getPixelCoordinates())
+        counts = subdivide(kernel, parameters, xs, ys, self.stats, self.checkCancelled)
+        self.storeValues(frame, counts)
+        self.i_max = max(self.i_max, int(math.ceil(counts.max())))
+        if progressHandler!=None: progressHandler(self, int((frame+1)*100/n))
+
+    def useProgressive(self):
+        return self.progressive and len(self.areas)==1 and self.getKernel()[0]!=None
+
+    def plotProgressive(self, progressHandler=None, passHandler=None):
+        """
+        renders a single frame in passes of decreasing pixel stride (PROGRESSIVE_STRIDES). Every 
+        pass computes only the pixels of its stride that the previous passes did not compute. 
+        After every pass but the last, passHandler(generator, plotValues, maxValue) receives a 
+        preview in which every computed pixel is repeated over the block up to the next one
+        """
+        log.debug(function=self.plotProgressive)
+        kernel, parameters = self.getKernel()
+        xs, ys = self.getPixelCoordinates()
+        mirror = self.getMirror(xs, ys)
+        xs, ys = self.toPrecision(xs, ys)
+        w,h = self.size
+        self.allocatePlot(1)
+        known = np.zeros((w,h), dtype=bool)
+        previous = None
+        for stride in PROGRESSIVE_STRIDES:
+            self.checkCancelled()
+            if stride==1 and previous!=None and self.useTiles():
+                # the last pass holds most of the pixels, it is rendered on the worker processes
+                self.plotTiles(progressHandler, skip=previous)
+                return
+            todo = strideMask(w, h, stride)
+            if previous!=None: todo &= ~strideMask(w, h, previous)
+            mirrored = None
+            if mirror!=None:
+                # mirrored pixels are skipped when their mirror image is known or computed in this pass
+                available = known | (todo & ~mirror[0])
+                mirrored = todo & mirror[0] & available[mirror[1][:, np.newaxis], mirror[2][np.newaxis, :]]
+                todo &= ~mirrored
+            px, py = np.nonzero(todo)
+            for i in range(0, len(px), BAND_SIZE):
+                self.checkCancelled()
+                bx, by = px[i:i+BAND_SIZE], py[i:i+BAND_SIZE]
+                counts = self.runKernel(kernel, parameters, xs[bx] + 1j*ys[by], 0, bx, by)
+                self.storeValues((0, bx, by), counts)
+                self.i_max = max(self.i_max, int(math.ceil(counts.max())))
+            if mirrored is not None:
+                self.fillMirrored(0, mirror, mirrored)
+                known |= mirrored
+            known |= todo
+            if progressHandler!=None: progressHandler(self, int(100/(stride*stride)))
+            if passHandler!=None and stride>1:
+                preview = self.plotValues[0, ::stride, ::stride].repeat(stride, axis=0).repeat(stride, axis=1)
+                passHandler(self, preview[np.newaxis, :w, :h], self.i_max)
+            previous = stride
+
+    def useTiles(self):
+        n = len(self.areas)
+        w,h = self.size
+        return (self.vectorized or self.smooth) and self.workers>1 and n*w*h>=BAND_SIZE and self.getKernel()[0]!=None
+
+    def plotTiles(self, progressHandler=None, skip=None, frames=None, executor=None):
+        """
+        splits every frame into tiles of tileSize x tileSize pixels and renders them on a pool
+        of worker processes. The workers write their tiles directly into a shared memory block,
+        which is copied into plotValues once all tiles are finished, the fractional parts of a 
+        smooth plot go to a block of their own.
+        frames (a range) renders only those frames, into plotValues as allocated by allocatePlot.
+        executor is a pool shared by the calls for several frames, without one a pool is started.
+        With skip, the pixels on the grid of stride skip are taken from plotValues.
+        When the state is kept, the workers return the final orbit points of their unescaped pixels.
+        Tiles that only hold mirrored pixels (see getMirror) are filled from their mirror images
+        """
+        n = len(self.areas)
+        frames = range(n) if frames==None else frames
+        w,h = self.size
+        ts = self.tileSize
+        shape = (len(frames),w,h)
+        dtype = np.dtype(plotDtype(self.maxIt))
+        shm = shared_memory.SharedMemory(create=True, size=len(frames)*w*h*dtype.itemsize)
+        if skip!=None: np.ndarray(shape, dtype=dtype, buffer=shm.buf)[:] = self.plotValues
+        fractionsShm = None
+        if self.smooth:
+            fractionsShm = shared_memory.SharedMemory(create=True, size=len(frames)*w*h*np.dtype(FRACTION_DTYPE).itemsize)
+            fractions = np.ndarray(shape, dtype=FRACTION_DTYPE, buffer=fractionsShm.buf)
+            fractions[:] = 0 if skip==None else self.plotFractions
+            del fractions
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers) if executor==None else contextlib.nullcontext(executor) as executor:
+                tiles = []
+                mirrors = {}
+                done = frames.start*w*h
+                for f in frames:
+                    self.area = self.areas[f]
+                    kernel, parameters = self.getKernel()
+                    xs, ys = self.getPixelCoordinates()
+                    mirror = self.getMirror(xs, ys)
+                    if mirror!=None: mirrors[f] = (mirror, np.zeros((w,h), dtype=bool))
+                    for y0 in range(0, h, ts):
+                        for x0 in range(0, w, ts):
+                            block = (slice(x0, x0+ts), slice(y0, y0+ts))
+                            if mirror!=None and mirror[0][block].all():
+                                mirrors[f][1][block] = True
+                                tw, th = mirror[0][block].shape
+                                done += tw*th if skip==None else np.count_nonzero(~strideMask(tw, th, skip, x0, y0))
+                                continue
+                            txs, tys = self.toPrecision(xs[x0:x0+ts], ys[y0:y0+ts])
+                            tiles.append(executor.submit(renderTile, kernel, parameters, 
+                                txs, tys, (shm.name, shape, dtype.str), f - frames.start, x0, y0, self.useSubdivision(), skip, 
+                                self.finals is not None, None if fractionsShm==None else fractionsShm.name))
+                if skip!=None: done += len(frames)*np.count_nonzero(strideMask(w, h, skip))
+                for tile in as_completed(tiles):
+                    if self.cancelToken!=None and self.cancelToken.isCancelled():
+                        executor.shutdown(wait=True, cancel_futures=True)
+                        self.checkCancelled()
+                    pixels, tileMax, stats, finals = tile.result()
+                    if finals!=None: self.finals.append(finals)
+                    done += pixels
+                    self.i_max = max(self.i_max, tileMax)
+                    self.addStats(stats)
+                    if progressHandler!=None:
+                        progressHandler(self, int(done*100/(n*w*h)))
+            if len(frames)<n or self.frameStore!=None:
+                self.plotValues[frames.start:frames.stop] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+                if fractionsShm!=None: self.plotFractions[frames.start:frames.stop] = np.ndarray(shape, dtype=FRACTION_DTYPE, buffer=fractionsShm.buf)
+            else:
+                self.plotValues = np.ndarray(shape, dtype=dtype, buffer=shm.buf).copy()
+                self.plotFractions = None
+                if fractionsShm!=None: self.plotFractions = np.ndarray(shape, dtype=FRACTION_DTYPE, buffer=fractionsShm.buf).copy()
+            for f, (mirror, pixels) in mirrors.items():
+                # the pixels on the grid of stride skip were filled (and counted) by the earlier passes
+                self.fillMirrored(f, mirror, pixels if skip==None else pixels & ~strideMask(w, h, skip))
+        finally:
+            shm.close()
+            shm.unlink()
+            if fractionsShm!=None:
+                fractionsShm.close()
+                fractionsShm.unlink()
+
+    def getFloatArea(self):
+        # areas may be given with Decimal coordinates, the float64 code paths use them as float
+        return tuple(float(v) for v in self.area)
+
+    def getPixelPitch(self):
+        xa,xb,ya,yb = [toDecimal(v) for v in self.area]
+        w,h = self.size
+        return min(abs(xb - xa)/(w - 1), abs(yb - ya)/(h - 1))
+
+    def needsExtendedPrecision(self):
+        # True when neighbouring pixels of the current area can not be told apart in float64
+        if self.area==None: return False
+        scale = max(abs(float(v)) for v in self.area)
+        return float(self.getPixelPitch()) < scale*EXTENDED_PRECISION_PITCH
+
+    def useDoubleDouble(self):
+        if self.doubleDouble!=None: return self.doubleDouble
+        return self.needsExtendedPrecision()
+
+    def useFloat32(self, xs, ys):
+        """
+        True when the block xs x ys of the current frame is iterated in float32. Automatically 
+        (float32 is None) for blocks whose pixel pitch is at least FLOAT32_PITCH relative to their 
+        largest coordinate or the escape radius, every other block falls back to float64
+        """
+        if self.useOffsets() or self.float32==False: return False
+        if self.float32: return True
+        scale = max(2.0, abs(xs[0]), abs(xs[-1]), abs(ys[0]), abs(ys[-1]))
+        return float(self.getPixelPitch()) >= scale*FLOAT32_PITCH
+
+    def toPrecision(self, xs, ys):
+        # the pixel coordinates of the block xs x ys in the precision it is iterated in
+        if self.useFloat32(xs, ys): return (xs.astype(np.float32), ys.astype(np.float32))
+        return (xs, ys)
+
+    def useOffsets(self):
+        # extended precision kernels get the pixels as offsets from the reference point
+        return self.useDoubleDouble()
+
+    def getReferencePoint(self):
+        # the center of the area
+        xa,xb,ya,yb = [toDecimal(v) for v in self.area]
+        with decimalContext(self.getPixelPitch()):
+            return ((xa + xb)/2, (ya + yb)/2)
+
+    def getDoubleDoubleReferencePoint(self):
+        cr, ci = self.getReferencePoint()
+        return toDoubleDouble(cr) + toDoubleDouble(ci)
+
+    def getPixelCoordinates(self):
+        w,h = self.size
+        if self.useOffsets():
+            # offsets of the pixels from the reference point
+            xa,xb,ya,yb = [toDecimal(v) for v in self.area]
+            cr, ci = self.getReferencePoint()
+            with decimalContext(self.getPixelPitch()):
+                fx = float((xb - xa)/(w - 1))
+                fy = float((yb - ya)/(h - 1))
+                x0 = float(xa - cr)
+                y0 = float(ya - ci)
+            return (np.arange(w) * fx + x0, np.arange(h) * fy + y0)
+        # on the lattice of the pixel pitch, so the pixels of an area centred on an axis are exact 
+        # mirror images (see mirroredPixels) and a panned or resized view shares the coordinates of 
+        # the pixels it has in common with the previous one (see canReuse). The scalar loops 
+        # sample the same points
+        return pixelCoordinates(self.area, self.size)
+
+    def plotBands(self, kernel, parameters, progressHandler=None, n=1, frame=0):
+        """
+        plots the current frame in horizontal bands of rows, kernel (see getKernel) receives 
+        the complex pixel coordinates of a band (shape (w, rows))
+        """
+        xs, ys = self.getPixelCoordinates()
+        w,h = self.size
+        mirror = self.getMirror(xs, ys)
+        # rows that are mirror images of other rows are filled in afterwards
+        rows = np.arange(h) if mirror==None else np.flatnonzero(~mirror[0].all(axis=0))
+        band = max(1, min(h, BAND_SIZE // w))
+        px = np.arange(w)[:, np.newaxis]
+        for i in range(0, len(rows), band):
+            self.checkCancelled()
+            by = rows[i:i+band]
+            counts = self.runKernel(kernel, parameters, complexGrid(*self.toPrecision(xs, ys[by])), frame, px, by[np.newaxis, :])
+            self.storeValues((frame, px, by[np.newaxis, :]), counts)
+            self.i_max = max(self.i_max, int(math.ceil(counts.max())))
+            if progressHandler!=None:
+                progressHandler(self, int((frame + min(len(rows), i+band)/len(rows))*100/n))
+        if mirror!=None: self.fillMirrored(frame, mirror)
         
-    async def generate(self, progressHandler=None):
-        self.plotValues, self.maxValue = self.plot(progressHandler=progressHandler)
-        log.trace(function=self.generate, returns=(self.plotValues.shape))
+    async def generate(self, progressHandler=None, passHandler=None):
+        """
+        runs plot() in the default executor, so the event loop keeps handling repaints and
+        messages. Progress and the previews of a progressive render are passed back to 
+        progressHandler and passHandler on the event loop thread. 
+        Raises GenerationCancelled when cancelToken is cancelled before the plot is complete
+        """
+        loop = asyncio.get_running_loop()
+        handler = None
+        if progressHandler!=None:
+            handler = lambda generator, p: loop.call_soon_threadsafe(progressHandler, generator, p)
+        previewHandler = None
+        if passHandler!=None:
+            previewHandler = lambda generator, plot, maxValue: loop.call_soon_threadsafe(passHandler, generator, plot, maxValue)
+        plotValues, maxValue = await loop.run_in_executor(None, functools.partial(self.plot, progressHandler=handler, passHandler=previewHandler))
+        self.checkCancelled()
+        self.plotValues, self.maxValue = plotValues, maxValue
+        log.trace(function=self.generate, returns=(self.plotValues.shape, self.stats))
 
 class JuliaGenerator(FractalGenerator):
     def __init__(self, source, size=(512,512), areas=[(-2.0,1.0,-1.5,1.5)], cxy=None, maxIt=256):
@@ -161,23 +1436,50 @@ class JuliaGenerator(FractalGenerator):
         self.cxy = cxy
         self.maxIt = maxIt
 
+    def getC(self):
+        cx, cy = self.cxy if self.cxy!=None else (random.random() * 2.0 - 1.0, random.random() - 0.5)
+        return complex(cx, cy)
+
+    def getStateKey(self):
+        return super().getStateKey() + repr(self.getC())
+
+    def getGridKey(self):
+        return super().getGridKey() + repr(self.getC())
+
+    def getSymmetry(self):
+        # z and -z have the same orbit after the first iteration, offsets from a reference point do not keep it
+        return None if self.useOffsets() else SYMMETRY_POINT
+
+    def getKernel(self):
+        if self.useDoubleDouble():
+            return (ddJuliaKernel, {"maxIt": self.maxIt, "smooth": self.smooth, "c": self.getC(), "center": self.getDoubleDoubleReferencePoint()})
+        return (self.kernels.get(juliaKernel, juliaKernel), {"maxIt": self.maxIt, "smooth": self.smooth, "c": self.getC(), "period": self.getPeriod()})
+
     def plotFrame(self, progressHandler=None, n=1, frame=0):
         log.debug(function=self.plotFrame, args=(n,frame))
-        cx, cy = self.cxy if self.cxy!=None else (random.random() * 2.0 - 1.0, random.random() - 0.5)
-        c = complex(cx, cy)
+        kernel, parameters = self.getKernel()
+        if self.vectorized or self.smooth or self.useOffsets():
+            self.plotBands(kernel, parameters, progressHandler, n, frame)
+        else:
+            self.plotFrameScalar(parameters["c"], progressHandler, n, frame)
+
+    def plotFrameScalar(self, c, progressHandler=None, n=1, frame=0):
         w,h = self.size
-        xa,xb,ya,yb = self.area  # drawing area (xa < xb and ya < yb)
-        fy = (yb - ya) / (h - 1)
-        fx = (xb - xa) / (w - 1)
-        total=n*h
+        xs, ys = [v.tolist() for v in self.getPixelCoordinates()]
+        period = self.getPeriod()
         for y in range(h):
-            zy = y * fy + ya
+            self.checkCancelled()
+            zy = ys[y]
             for x in range(w):
-                zx = x * fx + xa
+                zx = xs[x]
                 z = complex(zx, zy)
-                for i in range(self.maxIt):
-                    if abs(z) > 2.0: break 
-                    z = z * z + c 
+                if period!=None:
+                    i, skipped = escapeTimePeriodic(z, c, self.maxIt, *period)
+                    if skipped>0: self.addStats({"periodicPixels": 1, "skippedIterations": skipped})
+                else:
+                    for i in range(self.maxIt):
+                        if abs(z) > 2.0: break 
+                        z = z * z + c 
                 self.plotValues[frame, x, y] = i
                 self.i_max = i if i>self.i_max else self.i_max
             if progressHandler!=None and y % 10 == 0:
@@ -193,70 +1495,103 @@ class MandelbrotGenerator(FractalGenerator):
         self.area = None
         self.areas = areas
         self.maxIt = maxIt
-    
+        self.interiorCheck = True
+        # None selects the perturbation engine automatically from the pixel pitch, True or False forces it
+        self.perturbation = None
+        # skips the first iterations of the perturbation engine with a series approximation, off 
+        # by default: the probes of seriesApproximation limit its error but can not rule it out
+        self.seriesApproximation = False
+        self.__orbits = {}
+        self.__series = {}
+
+    def getGridKey(self):
+        return super().getGridKey() + repr((self.interiorCheck, self.perturbation, self.seriesApproximation))
+
+    def usePerturbation(self):
+        if self.perturbation!=None: return self.perturbation
+        return self.needsExtendedPrecision()
+
+    def useDoubleDouble(self):
+        # the perturbation engine is preferred, it is faster at any depth
+        if self.doubleDouble!=None: return self.doubleDouble and not self.usePerturbation()
+        return self.needsExtendedPrecision() and not self.usePerturbation()
+
+    def useOffsets(self):
+        return self.usePerturbation() or self.useDoubleDouble()
+
+    def getSymmetry(self):
+        # the orbit of the conjugate of c is the conjugate of the orbit of c
+        return None if self.useOffsets() else SYMMETRY_CONJUGATE
+
+    def getReferenceOrbit(self):
+        # the reference orbit is computed once per area
+        key = (tuple(self.area), self.maxIt)
+        if not key in self.__orbits:
+            self.__orbits[key] = referenceOrbit(self.getReferencePoint(), self.maxIt, self.getPixelPitch())
+        return self.__orbits[key]
+
+    def getSeries(self):
+        # series approximation for all pixels of the area, computed once per reference orbit and size
+        key = (tuple(self.area), self.maxIt, tuple(self.size))
+        if not key in self.__series:
+            xs, ys = self.getPixelCoordinates()
+            radius = max(abs(complex(x, y)) for x in (xs[0], xs[-1]) for y in (ys[0], ys[-1]))
+            # the corners and edge midpoints of the frame
+            probes = [complex(x, y) for x in (xs[0], xs[len(xs)//2], xs[-1]) for y in (ys[0], ys[len(ys)//2], ys[-1])]
+            self.__series[key] = seriesApproximation(self.getReferenceOrbit(), radius, float(self.getPixelPitch()), probes=probes)
+            log.debug(function=self.getSeries, returns=self.__series[key][0])
+        return self.__series[key]
+
+    def getKernel(self):
+        if self.usePerturbation():
+            cr, ci = self.getReferencePoint()
+            return (perturbationKernel, {"maxIt": self.maxIt, "orbit": self.getReferenceOrbit(), "c": complex(float(cr), float(ci)), "smooth": self.smooth, 
+                "series": self.getSeries() if self.seriesApproximation else None})
+        if self.useDoubleDouble():
+            return (ddMandelbrotKernel, {"maxIt": self.maxIt, "smooth": self.smooth, "center": self.getDoubleDoubleReferencePoint()})
+        return (self.kernels.get(mandelbrotKernel, mandelbrotKernel), {"maxIt": self.maxIt, "smooth": self.smooth, "interiorCheck": self.interiorCheck, "period": self.getPeriod()})
+
     def plotFrame(self, progressHandler=None, n=1, frame=0):
         log.debug(function=self.plotFrame, args=(n,frame))
+        if self.vectorized or self.smooth or self.useOffsets():
+            kernel, parameters = self.getKernel()
+            self.plotBands(kernel, parameters, progressHandler, n, frame)
+        else:
+            self.plotFrameScalar(progressHandler, n, frame)
+
+    def plotFrameScalar(self, progressHandler=None, n=1, frame=0):
         w,h = self.size
-        xa,xb,ya,yb = self.area  # drawing area (xa < xb and ya < yb)
-        fy = (yb - ya) / (h - 1)
-        fx = (xb - xa) / (w - 1)
-        total=n*h
+        xs, ys = [v.tolist() for v in self.getPixelCoordinates()]
+        skipped = 0
+        period = self.getPeriod()
         for y in range(h):
-            cy = y * fy  + ya
+            self.checkCancelled()
+            cy = ys[y]
             for x in range(w):
-                cx = x * fx + xa
-                c = complex(cx, cy)
-                z = 0
-                for i in range(self.maxIt):
-                    if abs(z) > 2.0: break 
-                    z = z * z + c 
+                cx = xs[x]
+                if self.interiorCheck and isInterior(cx, cy):
+                    i = self.maxIt - 1
+                    skipped += 1
+                elif period!=None:
+                    i, periodSkipped = escapeTimePeriodic(0j, complex(cx, cy), self.maxIt, *period)
+                    if periodSkipped>0: self.addStats({"periodicPixels": 1, "skippedIterations": periodSkipped})
+                else:
+                    c = complex(cx, cy)
+                    z = 0
+                    for i in range(self.maxIt):
+                        if abs(z) > 2.0: break 
+                        z = z * z + c 
                 self.plotValues[frame, x, y] = i
                 self.i_max = i if i>self.i_max else self.i_max
             if progressHandler!=None and y % 10 == 0:
                 frameprogress=y/h
                 totalprogress=frame + frameprogress
                 progressHandler(self, int(totalprogress*100/n))
+        addStat(self.stats, "interiorPixels", skipped)
         if progressHandler!=None: progressHandler(self, int((frame+1)*100/n))
 
 
-from decimal import Decimal
-class SmoothMandelbrotGenerator(FractalGenerator):
-    def __init__(self, source, size=(512,512), area=(-2.0,1.0,-1.5,1.5), maxIt=256):
-        super().__init__(source, size)
-        self.area = area
-        self.maxIt = maxIt
-
-    def plot(self, progressHandler=None):
-        w,h = self.size
-        self.plotValues = np.empty(self.size)
-        xa,xb,ya,yb = self.area  # drawing area (xa < xb and ya < yb)
-        fy = (yb - ya) / (h - 1)
-        fx = (xb - xa) / (w - 1)
-        mu_max = 0
-        for y in range(h):
-            cy = y * fy  + ya
-            for x in range(w):
-                cx = x * fx + xa
-                c = complex(cx, cy)
-                z = complex(0, 0)
-                for i in range(self.maxIt):
-                    modulus = Decimal(math.sqrt(z.real*z.real + z.imag*z.imag))
-                    if modulus > 2.0: break
-                    z = z*z+c 
-
-                for n in range(2): z=z*z+c
-                i += n+1
-                modulus = Decimal(math.sqrt(z.real*z.real + z.imag*z.imag))
-                try:
-                    mu = i - math.log(math.log(modulus)) / math.log(Decimal(2.0))
-                except ValueError as ve:
-                    mu = i
-                finally:
-                    mu_max = mu if mu>mu_max else mu_max
-                    self.plotValues[x,y] = int(mu)
-
-            if progressHandler!=None and y % 10 == 0:
-                progressHandler(self, int(100*y/h))
-        progressHandler(self, 100)
-
-    
+class SmoothMandelbrotGenerator(MandelbrotGenerator):
+    def __init__(self, source, size=(512,512), areas=[(-2.0,1.0,-1.5,1.5)], maxIt=256):
+        super().__init__(source, size, areas, maxIt)
+        self.smooth = True
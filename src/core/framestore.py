@@ -0,0 +1,107 @@
+#foreign
+import atexit
+import mmap
+import os
+import shutil
+import tempfile
+import numpy as np
+
+#project
+import lib.wxdyn.log as  log
+import core.fgen
+
+class FrameStore:
+    """
+    Keeps the plot of an animation in memory-mapped .npy files, so the generator writes every
+    frame to disk when it is finished and the frames are read back one at a time when they are
+    coloured or exported. path is the file of the escape counts, the fractional parts of smooth
+    plot values are kept next to it (see getFractionsPath). Stores are rendered in a temporary 
+    directory (see getTempDirectory) and copied into the project directory when it is saved
+    """
+    PREFIX = "frames_"
+    EXTENSION = ".npy"
+    FRACTIONS_EXTENSION = ".fractions.npy"
+    __tempDirectory = None
+
+    def __init__(self, path):
+        self.path = path
+        self.__counts = None
+        self.__fractions = None
+
+    @staticmethod
+    def create(directory):
+        # a new store in directory, named after the first unused frames_<i>.npy
+        i = 1
+        while os.path.exists(os.path.join(directory, FrameStore.PREFIX + str(i) + FrameStore.EXTENSION)): i += 1
+        return FrameStore(os.path.join(directory, FrameStore.PREFIX + str(i) + FrameStore.EXTENSION))
+
+    @staticmethod
+    def getTempDirectory():
+        # the directory of the stores of this process that are not saved yet, removed on exit
+        if FrameStore.__tempDirectory==None:
+            FrameStore.__tempDirectory = tempfile.mkdtemp(prefix="frimage_")
+            atexit.register(shutil.rmtree, FrameStore.__tempDirectory, True)
+        return FrameStore.__tempDirectory
+
+    @staticmethod
+    def isStore(fileName):
+        return fileName.startswith(FrameStore.PREFIX) and fileName.endswith(FrameStore.EXTENSION) \
+            and not fileName.endswith(FrameStore.FRACTIONS_EXTENSION)
+
+    @staticmethod
+    def clean(directory, keep):
+        # removes the stores in directory whose file names are not in keep
+        for fileName in os.listdir(directory):
+            if FrameStore.isStore(fileName) and not fileName in keep:
+                FrameStore(os.path.join(directory, fileName)).remove()
+
+    def getName(self):
+        return os.path.basename(self.path)
+
+    def getFractionsPath(self):
+        return self.path[:-len(FrameStore.EXTENSION)] + FrameStore.FRACTIONS_EXTENSION
+
+    def isIn(self, directory):
+        return os.path.normcase(os.path.dirname(os.path.abspath(self.path)))==os.path.normcase(os.path.abspath(directory))
+
+    def copy(self, directory):
+        # copies the files of the store to a new store in directory, returns the new store
+        log.debug(function=self.copy, args=(self.path, directory))
+        store = FrameStore.create(directory)
+        shutil.copyfile(self.path, store.path)
+        if os.path.exists(self.getFractionsPath()): shutil.copyfile(self.getFractionsPath(), store.getFractionsPath())
+        return store
+
+    def allocate(self, shape, dtype, smooth=False):
+        """
+        creates the files for a plot of shape, returns them memory-mapped as (counts, fractions),
+        fractions is None unless smooth
+        """
+        log.debug(function=self.allocate, args=(self.path, shape, dtype, smooth))
+        self.__counts = np.lib.format.open_memmap(self.path, mode="w+", dtype=dtype, shape=shape)
+        self.__fractions = None
+        if smooth:
+            self.__fractions = np.lib.format.open_memmap(self.getFractionsPath(), mode="w+", dtype=core.fgen.FRACTION_DTYPE, shape=shape)
+        elif os.path.exists(self.getFractionsPath()):
+            os.remove(self.getFractionsPath())
+        return (self.__counts, self.__fractions)
+
+    def flush(self):
+        # writes the frames finished so far to disk and releases their pages, they are read back when needed
+        for frames in (self.__counts, self.__fractions):
+            if frames is not None:
+                frames.flush()
+                if hasattr(mmap, "MADV_DONTNEED"): frames._mmap.madvise(mmap.MADV_DONTNEED)
+
+    def open(self):
+        # the stored plot as read-only memory maps (counts, fractions)
+        counts = np.load(self.path, mmap_mode="r")
+        fractions = None
+        if os.path.exists(self.getFractionsPath()):
+            fractions = np.load(self.getFractionsPath(), mmap_mode="r")
+        return (counts, fractions)
+
+    def remove(self):
+        log.debug(function=self.remove, args=self.path)
+        for path in (self.path, self.getFractionsPath()):
+            if os.path.exists(path): os.remove(path)
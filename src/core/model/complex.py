@@ -1,4 +1,7 @@
 #foreign
+import asyncio
+import os
+from decimal import Decimal
 from tkinter import DOTBOX
 import numpy as np
 
@@ -6,9 +9,15 @@ import numpy as np
 import lib.wxdyn.log as  log
 import lib.wxdyn as wxd
 import core.fgen
+from core.export import AnimationExporter
+from core.framestore import FrameStore
 from .project import Project
 
 class Area(wxd.ModelObject):
+    """
+    rectangular area (xa, xb, ya, yb) of the complex plane. The coordinates are kept as Decimal, 
+    so areas deep down the zoom tree are not limited by the precision of float
+    """
     def __init__(self, project, area=None):
         super().__init__(project)
         self.__xa = None
@@ -39,57 +48,70 @@ class Area(wxd.ModelObject):
         return (self.__xb - self.__xa, self.__yb - self.__ya)
 
     def setXa(self, v): 
-        fv = float(v) if v!=None else None
+        fv = core.fgen.toDecimal(v) if v!=None else None
         log.debug(function=self.setXa, args=fv)
         self.__xa = fv
         self.setModified()
         log.debug("area:", self.toString())
 
     def setXb(self, v): 
-        fv = float(v) if v!=None else None
+        fv = core.fgen.toDecimal(v) if v!=None else None
         log.debug(function=self.setXb, args=fv)
         self.__xb = fv
         self.setModified()
         log.debug("area:", self.toString())
 
     def setYa(self, v): 
-        fv = float(v) if v!=None else None
+        fv = core.fgen.toDecimal(v) if v!=None else None
         log.debug(function=self.setYa, args=fv)
         self.__ya = fv
         self.setModified()
         log.debug("area:", self.toString())
 
     def setYb(self, v): 
-        fv = float(v) if v!=None else None
+        fv = core.fgen.toDecimal(v) if v!=None else None
         log.debug(function=self.setYb, args=fv)
         self.__yb = fv
         self.setModified()
         log.debug("area:", self.toString())
 
     def setAll(self, area):
-        self.__xa, self.__xb, self.__ya, self.__yb = area
+        self.__xa, self.__xb, self.__ya, self.__yb = [core.fgen.toDecimal(v) for v in area]
         self.setModified()
 
     def setRect(self, rect):
         log.debug(function=self.setRect, args=rect)
-        x,y,w,h = rect
-        self.__xa = x
-        self.__xb = x+w
-        self.__ya = y
-        self.__yb = y+h
+        x,y,w,h = [core.fgen.toDecimal(v) for v in rect]
+        with core.fgen.decimalContext(min(w,h)):
+            self.__xa = x
+            self.__xb = x+w
+            self.__ya = y
+            self.__yb = y+h
         self.setModified()
 
+    def getSubRect(self, sx, sy, scale):
+        """
+        returns the rect (x, y, w, h) of the area that starts at the relative position (sx, sy)
+        of this area and is scale times its size, in the precision of this area
+        """
+        ax,ay,aw,ah = self.getRect()
+        sx, sy, scale = [core.fgen.toDecimal(v) for v in (sx, sy, scale)]
+        with core.fgen.decimalContext(min(aw,ah)*scale):
+            return (ax+sx*aw, ay+sy*ah, aw*scale, ah*scale)
+
     def getAdjusted(self, targetSize):
         log.debug(function=self.getAdjusted, args=targetSize)
         tw,th = targetSize
         ax,ay,aw,ah = self.getRect()
-        tr = tw/th
-        ar = aw/ah
-        if ar==tr: return self.getAll()
-        if ar<tr:
-            return(ax, ax+ah*tr, ay, ay+aw)
-        else:
-            return (ax, ax+aw, ay, ay+aw/tr)
+        with core.fgen.decimalContext(min(aw,ah)):
+            # the ratio of the pixel grid, so the pixels are square and the pixel pitch is kept when the size changes
+            tr = Decimal(tw - 1)/Decimal(th - 1)
+            ar = aw/ah
+            if ar==tr: return self.getAll()
+            if ar<tr:
+                return(ax, ax+ah*tr, ay, ay+ah)
+            else:
+                return (ax, ax+aw, ay, ay+aw/tr)
 
     def toString(self):
         s =  self.getId() + ": " + str((self.__xa, self.__xb, self.__ya, self.__yb))
@@ -132,11 +154,21 @@ class GeneratedSet(wxd.ModelObject):
         self.area = Area(self, area)
         self.__name = name
         self.__generatedPlot__ = None
+        self.__generatedFractions__ = None
         self.__maxPlotValue = None
         self.__cachedImage__ = None
+        self.__cachedImageKey__ = None
+        self.__state = None
+        self.__maxIt = None
+        self.__escapeHistogram = None
+        self.__frameStore = None
+        self.__grid__ = None
         self.__generatedSets__ = []
         self.persist("name")
         self.persist("maxPlotValue")
+        self.persist("maxIt")
+        self.persist("escapeHistogram")
+        self.persist("frameStore")
 
     def clear(self):
         self.__generatedSets__ = []
@@ -162,13 +194,18 @@ class GeneratedSet(wxd.ModelObject):
     def getCachedImage(self):
         return self.__cachedImage__
 
-    def setCachedImage(self, im):
+    def getCachedImageKey(self):
+        return self.__cachedImageKey__
+
+    def setCachedImage(self, im, key=None):
         log.debug(function=self.setCachedImage, args=im)
         self.__cachedImage__ = im
+        self.__cachedImageKey__ = key
 
     def getGeneratedPlot(self):
         try:
-            if self.__generatedPlot__.any() == None: return None
+            # size instead of any(), a plot in a frame store is not read as a whole
+            if self.__generatedPlot__.size == 0: return None
         except AttributeError as ae:
             log.error(ae, function=self.getGeneratedPlot)
             return None
@@ -176,8 +213,16 @@ class GeneratedSet(wxd.ModelObject):
             return None
         return self.__generatedPlot__
 
-    def setGeneratedPlot(self, plot):
+    def getGeneratedFractions(self):
+        # fractional parts of the values of a smooth plot, None for whole escape counts
+        return self.__generatedFractions__
+
+    def setGeneratedPlot(self, plot, fractions=None):
         self.__generatedPlot__ = plot
+        self.__generatedFractions__ = fractions
+        self.__frameStore = os.path.basename(plot.filename) if isinstance(plot, np.memmap) else None
+        self.__cachedImage__ = None
+        self.__cachedImageKey__ = None
         self.setModified()
 
     def getMaxPlotValue(self):
@@ -190,6 +235,69 @@ class GeneratedSet(wxd.ModelObject):
     def hasGeneratedPlot(self):
         return self.__maxPlotValue!=None
 
+    def getMaxIt(self):
+        # maxIt of the generated plot
+        return self.__maxIt
+
+    def setMaxIt(self, maxIt):
+        self.__maxIt = maxIt
+        self.setModified()
+
+    def getEscapeHistogram(self):
+        # escape counts of the probe render that chose maxIt automatically, see FractalGenerator.chooseMaxIt
+        return self.__escapeHistogram
+
+    def setEscapeHistogram(self, histogram):
+        self.__escapeHistogram = histogram
+        self.setModified()
+
+    def getFrameStore(self):
+        # file name of the frame store that holds the plot, in the project directory (see core.framestore)
+        return self.__frameStore
+
+    def setFrameStore(self, name):
+        self.__frameStore = name
+        self.setModified()
+
+    def getGrid(self):
+        # (key, area) of the pixel grid of the generated plot, see FractalGenerator.grid
+        return self.__grid__
+
+    def setGrid(self, grid):
+        self.__grid__ = grid
+
+    def getFrameStores(self):
+        stores = [] if self.__frameStore==None else [self.__frameStore]
+        for gs in self.getGeneratedSets():
+            stores += gs.getFrameStores()
+        return stores
+
+    def saveFrameStores(self, storage):
+        # stores in another directory (rendered in the temporary directory, or kept by the project saved under another name) are copied to storage
+        plot = self.__generatedPlot__
+        if self.__frameStore!=None and isinstance(plot, np.memmap) and not FrameStore(plot.filename).isIn(storage.getPath()):
+            self.setGeneratedPlot(*FrameStore(plot.filename).copy(storage.getPath()).open())
+        for gs in self.getGeneratedSets():
+            gs.saveFrameStores(storage)
+
+    def openFrameStores(self, storage):
+        # plots kept in a frame store are mapped from it instead of loaded from plots.npz
+        if self.__frameStore!=None:
+            path = storage.toPath(self.__frameStore)
+            if path!=None:
+                self.setGeneratedPlot(*FrameStore(path).open())
+            else:
+                log.error("missing frame store", self.__frameStore, function=self.openFrameStores)
+        for gs in self.getGeneratedSets():
+            gs.openFrameStores(storage)
+
+    def getState(self):
+        # (key, maxIt, index, z) as kept by the generator, see FractalGenerator.keepState
+        return self.__state
+
+    def setState(self, state):
+        self.__state = state
+
     def addGeneratedSet(self):
         newSet = self.newGeneratedSet()
         self.__generatedSets__.append(newSet)
@@ -217,22 +325,51 @@ class GeneratedSet(wxd.ModelObject):
         return depth
 
     def getPlots(self):
-        plots = {self.getName():self.getGeneratedPlot()}
+        plots = {}
+        if self.__frameStore==None:
+            plots[self.getName()] = self.getGeneratedPlot()
+            if self.__generatedFractions__ is not None:
+                plots[self.getName()+".fractions"] = self.__generatedFractions__
         for gs in self.getGeneratedSets():
             plots.update(gs.getPlots())
         return plots
 
     def setPlots(self, plots):
-        if self.getName() in plots.keys():
-            self.setGeneratedPlot(plots[self.getName()])
+        name = self.getName()
+        if name in plots.keys():
+            plot = plots[name]
+            fractions = plots[name+".fractions"] if name+".fractions" in plots.keys() else None
+            if np.issubdtype(plot.dtype, np.floating):
+                # saved before the escape counts were compacted
+                plot, fractions = core.fgen.compactPlot(plot)
+            self.setGeneratedPlot(plot, fractions)
         for gs in self.getGeneratedSets():
             gs.setPlots(plots)
 
+    def getStates(self):
+        # the iteration states as arrays, keyed by the name of the set and the state field
+        states = {}
+        if self.__state!=None:
+            key, maxIt, index, z = self.__state
+            name = self.getName()
+            states.update({name+".key": np.array(key), name+".maxIt": np.array(maxIt), name+".index": index, name+".z": z})
+        for gs in self.getGeneratedSets():
+            states.update(gs.getStates())
+        return states
+
+    def setStates(self, states):
+        name = self.getName()
+        if name+".key" in states.keys():
+            self.setState((str(states[name+".key"]), int(states[name+".maxIt"]), states[name+".index"], states[name+".z"]))
+        for gs in self.getGeneratedSets():
+            gs.setStates(states)
+
     def savePlots(self, storage):
         path = storage.toPath("plots.npz", False)
         plots = self.getPlots()
         try:
             np.savez_compressed(path, **plots)
+            np.savez_compressed(storage.toPath("states.npz", False), **self.getStates())
         except OSError as oe:
             log.error(oe, function=self.savePlots)
         except AttributeError as ae:
@@ -245,6 +382,10 @@ class GeneratedSet(wxd.ModelObject):
         try:
             plots = np.load(path)
             self.setPlots(plots)
+            self.openFrameStores(storage)
+            # projects saved without iteration states simply start from scratch
+            statesPath = storage.toPath("states.npz")
+            if statesPath!=None: self.setStates(np.load(statesPath))
         except OSError as oe:
             log.error(oe, function=self.loadPlots)
         except AttributeError as ae:
@@ -258,7 +399,13 @@ class ComplexProject(Project):
         self.generator = None
         self.animationsteps = None
         self.__maxIt = None
+        self.__smooth = False
+        self.__resumable = False
+        self.__autoMaxIt = False
         self.persist("maxIt")
+        self.persist("smooth", False)
+        self.persist("resumable", False)
+        self.persist("autoMaxIt", False)
 
     def initRootSet(self):
         self.rootSet = GeneratedSet(self, "root")
@@ -270,6 +417,27 @@ class ComplexProject(Project):
     def getMaxIt(self):
         return self.__maxIt
 
+    def setSmooth(self, smooth):
+        self.__smooth = smooth
+        self.setModified()
+
+    def getSmooth(self):
+        return self.__smooth
+
+    def setAutoMaxIt(self, auto):
+        self.__autoMaxIt = auto
+        self.setModified()
+
+    def getAutoMaxIt(self):
+        return self.__autoMaxIt
+
+    def setResumable(self, resumable):
+        self.__resumable = resumable
+        self.setModified()
+
+    def getResumable(self):
+        return self.__resumable
+
     def getArea(self):
         return self.currentSet.getArea()
 
@@ -287,24 +455,44 @@ class ComplexProject(Project):
     def getCurrentSet(self):
         return self.currentSet
 
+    def getCachedImageKey(self):
+        # everything the cached image depends on apart from the gradient
+        return (id(self.getGeneratedPlot()), self.getMaxPlotValue(), self.getSize(), self.getBorderSize(), self.getBorderColourPick())
+
     def getGeneratedImage(self):
         log.debug(function=self.getGeneratedImage)
+        if self.getPassImage()!=None: return self.getPassImage()
         if self.currentSet == None: return None
         im = self.currentSet.getCachedImage()
-        if im==None or self.getModified():
+        key = self.getCachedImageKey()
+        if im==None or self.currentSet.getCachedImageKey()!=key:
             im = self.getFormattedImage()
-            self.currentSet.setCachedImage(im)
+            self.currentSet.setCachedImage(im, key)
+        elif im.mode=='P':
+            # a changed gradient only replaces the palette of an indexed image
+            palette = core.fgen.getPalette(self.getGradientPixels())
+            if palette!=im.getpalette():
+                im = im.copy()
+                im.putpalette(palette)
+                self.currentSet.setCachedImage(im, key)
+        elif im.info.get("gradient")!=self.getGradientPixels():
+            im = self.getFormattedImage()
+            self.currentSet.setCachedImage(im, key)
         return im
 
     def getGeneratedPlot(self):
         if self.currentSet == None: return None
         return self.currentSet.getGeneratedPlot()
 
-    def setGeneratedPlot(self, plot):
+    def getGeneratedFractions(self):
+        if self.currentSet == None: return None
+        return self.currentSet.getGeneratedFractions()
+
+    def setGeneratedPlot(self, plot, fractions=None):
         log.debug(function=self.setGeneratedPlot)
         assert self.currentSet != None
-        self.currentSet.setGeneratedPlot(plot)
-        self.currentSet.setCachedImage(self.getFormattedImage())
+        self.currentSet.setGeneratedPlot(plot, fractions)
+        self.currentSet.setCachedImage(self.getFormattedImage(), self.getCachedImageKey())
         self.setModified()
 
     def getMaxPlotValue(self):
@@ -316,7 +504,42 @@ class ComplexProject(Project):
         self.currentSet.setMaxPlotValue(v)
         self.setModified()
 
+    def getPreviewState(self):
+        return (super().getPreviewState(), self.currentSet.getId())
+
+    def setupResume(self, generator, genSet):
+        # a regenerated set continues from the iteration state of genSet, the generator checks 
+        # that only maxIt was raised (see FractalGenerator.canResume). A panned or resized view 
+        # reuses the pixels it shares with the plot of genSet (see FractalGenerator.canReuse)
+        generator.setup(keepState=self.getResumable())
+        if genSet.getGrid()!=None and genSet.hasGeneratedPlot():
+            generator.setup(reuseGrid=genSet.getGrid(), reusePlot=genSet.getGeneratedPlot(), 
+                reuseFractions=genSet.getGeneratedFractions())
+        if self.getResumable() and genSet.getState()!=None:
+            generator.setup(resumePlot=genSet.getGeneratedPlot(), resumeFractions=genSet.getGeneratedFractions(), 
+                resumeState=genSet.getState())
+
+    def postGenerate(self, generator):
+        self.currentSet.setState(generator.state)
+        self.currentSet.setGrid(generator.grid)
+        self.currentSet.setMaxIt(generator.maxIt)
+        self.currentSet.setEscapeHistogram(generator.escapeHistogram)
+
+    def getGenerateState(self):
+        return self.currentSet
+
+    def restoreGenerateState(self, state):
+        # remove the set that preGenerate added for the cancelled generation
+        if state!=None and self.currentSet!=state:
+            cancelledSet = self.currentSet
+            self.currentSet = state
+            if cancelledSet in state.getGeneratedSets():
+                state.remove(cancelledSet)
+                state.removeChild(cancelledSet)
+            self.setModified()
+
     def down(self, genSet):
+        if genSet!=self.currentSet: self.cancelGenerate()
         parent = genSet.getParent()
         while isinstance(parent, GeneratedSet): parent = parent.getParent()
         if parent != None and isinstance(genSet, GeneratedSet) and parent==self:
@@ -326,10 +549,12 @@ class ComplexProject(Project):
 
     def home(self):
         log.debug(function=self.home)
+        self.cancelGenerate()
         self.currentSet = self.getRootSet()
         self.setModified()
 
     def up(self):
+        self.cancelGenerate()
         parent = self.currentSet.getParent()
         if parent != None and isinstance(parent, GeneratedSet):
             log.debug(function=self.up)
@@ -338,6 +563,7 @@ class ComplexProject(Project):
 
     def remove(self):
         log.trace(function=self.remove, args=self.getFullId())
+        self.cancelGenerate()
         toRemove = self.getCurrentSet() 
         root = self.getRootSet()
         if toRemove == root:
@@ -350,6 +576,7 @@ class ComplexProject(Project):
         self.setModified()
 
     def makeRoot(self):
+        self.cancelGenerate()
         toBecomeRoot = self.getCurrentSet()
         oldRoot = self.getRootSet()
         if toBecomeRoot != oldRoot:
@@ -368,7 +595,7 @@ class ComplexProject(Project):
         src = self.getProjectSource().getSourceImage()
         cache = self.getRootSet().getCachedImage()
         if cache:
-            im = cache.copy()
+            im = cache.convert('RGB')
             im.thumbnail((150,150))
             if src:
                 srcThumb = src.copy()
@@ -390,7 +617,14 @@ class ComplexProject(Project):
 
     def savePlots(self, storage):
         self.getProjectSource().saveSourceImage(storage)
+        self.getRootSet().saveFrameStores(storage)
         self.getRootSet().savePlots(storage)
+        # frame stores of removed sets and of earlier animations of a set are no longer needed
+        FrameStore.clean(storage.getPath(), self.getRootSet().getFrameStores())
+
+    def newFrameStore(self):
+        # animations are rendered into a frame store in the temporary directory, saving the project copies it (see saveFrameStores)
+        return FrameStore.create(FrameStore.getTempDirectory())
 
     def loadPlots(self, storage):
         self.getRootSet().loadPlots(storage)
@@ -416,6 +650,31 @@ class ComplexProject(Project):
         self.animationsteps.append(startArea.getAll())
         log.debug(function=self.animationSetup, args=(startArea, stopArea, steps, (dax,day,dbx,dby)))
 
+    async def exportAnimation(self, path, progressHandler=None, duration=120):
+        """
+        exports the frames of the current plot (as rendered from animationsteps) to path.
+        The frames are formatted one at a time and handed to an AnimationExporter that 
+        encodes them in the background
+        """
+        log.debug(function=self.exportAnimation, args=path)
+        plot = self.getGeneratedPlot()
+        if plot is None: return
+        loop = asyncio.get_running_loop()
+        handler = None
+        if progressHandler!=None:
+            handler = lambda exporter, p: loop.call_soon_threadsafe(progressHandler, exporter, p)
+        n = core.fgen.getFrameCount(plot)
+        exporter = AnimationExporter(path, n, duration, progressHandler=handler)
+        exporter.start()
+        try:
+            for f in range(n):
+                im = self.getFormattedImage(f)
+                await loop.run_in_executor(None, exporter.addFrame, im)
+        except Exception as e:
+            exporter.abort()
+            raise e
+        await loop.run_in_executor(None, exporter.finish)
+
 
 class MandelbrotProject(ComplexProject):
     DEFAULT_AREA = (-2.0,1.0,-1.5,1.5)
@@ -442,7 +701,10 @@ class MandelbrotProject(ComplexProject):
         log.debug(function=self.preGenerate, args=setup)
         generator.setup(
             size=self.getSize(), 
-            reverseColors=self.getProjectSource().getFlipGradient() 
+            maxIt=self.getMaxIt(),
+            autoMaxIt=self.getAutoMaxIt(),
+            reverseColors=self.getProjectSource().getFlipGradient(), 
+            smooth=self.getSmooth()
         )
         # is a setup parameter provided? (either "area" or "animationsteps")
         if setup!=None and len(setup.keys())==1:
@@ -455,15 +717,18 @@ class MandelbrotProject(ComplexProject):
                 generator.setup(areas=[genSet.getArea().getAdjusted(self.getSize())])
                 self.currentSet = genSet
             if "animationsteps" in setup.keys():
-                generator.setup(areas=setup["animationsteps"])
+                generator.setup(areas=setup["animationsteps"], frameStore=self.newFrameStore())
         else:
             generator.setup(areas=[self.currentSet.getArea().getAdjusted(self.getSize())])
+        self.setupResume(generator, self.currentSet)
 
     def prePreview(self, generator, **setup):
         log.debug(function=self.prePreview, args=generator)
         generator.setup(
+            maxIt=self.getMaxIt(),
             reverseColors=self.getProjectSource().getFlipGradient(), 
-            area=self.currentSet.getArea().getAll()
+            smooth=self.getSmooth(),
+            areas=[self.currentSet.getArea().getAdjusted(self.getSize())]
         )
 
 
@@ -528,6 +793,7 @@ class JuliaProject(ComplexProject):
         else:
             areaRect = self.currentSet.getArea().getRect()
         cxy = self.currentSet.getCxy().getCxy()
+        previousSet = self.currentSet
         if areaRect!=None and self.currentSet.hasGeneratedPlot():
             genSet = self.currentSet.addGeneratedJuliaSet()
             genSet.getArea().setRect(areaRect)
@@ -535,15 +801,22 @@ class JuliaProject(ComplexProject):
             self.currentSet = genSet
         generator.setup(
             size=self.getSize(), 
+            maxIt=self.getMaxIt(),
+            autoMaxIt=self.getAutoMaxIt(),
             reverseColors=self.getProjectSource().getFlipGradient(), 
+            smooth=self.getSmooth(),
             areas=[self.currentSet.getArea().getAdjusted(self.getSize())],
             cxy=self.currentSet.getCxy().getCxy()
         )
+        # a new set with the area of the previous one continues from its state
+        self.setupResume(generator, previousSet)
     
     def prePreview(self, generator, **setup):
         log.debug(function=self.prePreview, args=generator)
         generator.setup(
+            maxIt=self.getMaxIt(),
             reverseColors=self.getProjectSource().getFlipGradient(), 
-            area=self.currentSet.getArea().getAll(),
+            smooth=self.getSmooth(),
+            areas=[self.currentSet.getArea().getAdjusted(self.getSize())],
             cxy=self.currentSet.getCxy().getCxy()
         )
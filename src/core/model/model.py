@@ -65,7 +65,8 @@ class Model(wxd.Publisher):
         return self.__currentProject__
 
     def saveProperties(self, io):
-        data = json.dumps(self.__currentProject__.serialize(), indent=4)
+        # Decimal area coordinates are saved as strings
+        data = json.dumps(self.__currentProject__.serialize(), indent=4, default=str)
         io.write(data)
         self.getCurrentProject().setTouched(False)
         self.dispatch("msg_project_saved", {"project": self.__currentProject__})
@@ -106,15 +107,20 @@ class Model(wxd.Publisher):
     async def animate(self, progressHandler=None):
         prj = self.getCurrentProject()
         if isinstance(prj, ComplexProject):
-            await prj.generate(progressHandler, animationsteps=prj.animationsteps)
-            self.dispatch("msg_generate_complete", {"project": self.__currentProject__})
+            if await prj.generate(progressHandler, animationsteps=prj.animationsteps):
+                self.dispatch("msg_generate_complete", {"project": self.__currentProject__})
 
-    async def preview(self, **kw):
-        await self.getCurrentProject().preview(**kw)
+    async def exportAnimation(self, path, progressHandler=None):
+        prj = self.getCurrentProject()
+        if isinstance(prj, ComplexProject):
+            await prj.exportAnimation(path, progressHandler)
+
+    async def preview(self, cancelToken=None, **kw):
+        await self.getCurrentProject().preview(cancelToken, **kw)
 
     async def generate(self, progressHandler=None, **kw):
-        await self.getCurrentProject().generate(progressHandler, **kw)
-        self.dispatch("msg_generate_complete", {"project": self.__currentProject__})
+        if await self.getCurrentProject().generate(progressHandler, **kw):
+            self.dispatch("msg_generate_complete", {"project": self.__currentProject__})
 
     def getGeneratedImage(self):
         return self.getCurrentProject().getGeneratedImage()
@@ -1,7 +1,9 @@
+import asyncio
 import lib.wxdyn.log as  log
 import lib.wxdyn as wxd
 from lib.imgbox import ImageBox
 import core.fgen
+import core.backends
 from .projectsource import ProjectSource
 
 class Project(wxd.ModelObject):
@@ -14,15 +16,21 @@ class Project(wxd.ModelObject):
         self.__height = None
         self.__borderSize = 0
         self.__borderColourPick = 255
+        self.__progressive = True
+        self.__backend = core.backends.AUTO
         self.projectSource = ProjectSource(self)
         self.__generatedPlot__ = None
+        self.__generatedFractions__ = None
         self.__maxPlotValue__ = None
         self.__generatedImage__ = None
         self.path = None
         self.progress = 0
         self.__preview__ = False
         self.previewImage = None
+        # image of the last pass of a progressive render in progress, the plot is only set when the render is complete
+        self.__passImage__ = None
         self.__touched__ = False
+        self.__generation__ = None
         self.persist("name")
         self.persist("artist")
         self.persist("version")
@@ -30,6 +38,8 @@ class Project(wxd.ModelObject):
         self.persist("height")
         self.persist("borderSize", 2)
         self.persist("borderColourPick", 255)
+        self.persist("progressive", True)
+        self.persist("backend", core.backends.AUTO)
         
     def reset(self):
         pass
@@ -66,6 +76,14 @@ class Project(wxd.ModelObject):
         self.__borderColourPick = p
         self.setModified()
 
+    def setProgressive(self, progressive):
+        self.__progressive = progressive
+        self.setModified()
+
+    def setBackend(self, backend):
+        self.__backend = backend
+        self.setModified()
+
     def setPath(self, path):
         self.path = path
         self.setModified()
@@ -103,6 +121,13 @@ class Project(wxd.ModelObject):
     def getBorderColourPick(self):
         return self.__borderColourPick
 
+    def getProgressive(self):
+        return self.__progressive
+
+    def getBackend(self):
+        # name of the compute backend of the generators, see core.backends
+        return self.__backend
+
     def getPath(self):
         return self.path
 
@@ -138,8 +163,13 @@ class Project(wxd.ModelObject):
     def getGeneratedPlot(self):
         return self.__generatedPlot__
 
-    def setGeneratedPlot(self, plot):
+    def getGeneratedFractions(self):
+        # fractional parts of the values of a smooth plot, None for whole escape counts
+        return self.__generatedFractions__
+
+    def setGeneratedPlot(self, plot, fractions=None):
         self.__generatedPlot__ = plot
+        self.__generatedFractions__ = fractions
         self.setModified()
 
     def getMaxPlotValue(self):
@@ -158,6 +188,26 @@ class Project(wxd.ModelObject):
         log.debug(function=self.onProgress, args=p)
         self.setProgress(p)
 
+    def getPassImage(self):
+        return self.__passImage__
+
+    def setPassImage(self, im):
+        # notifies the views, the model itself does not change
+        self.__passImage__ = im
+        self.dispatch("msg_object_modified", {"object": self})
+
+    def onRenderPass(self, generator, plot, maxValue):
+        # shows the preview of a progressive render that is still in progress, without passing it to the model
+        if generator.cancelToken!=None and generator.cancelToken.isCancelled(): return
+        log.debug(function=self.onRenderPass, args=maxValue)
+        self.setPassImage(self.formatPlot(plot, maxValue))
+
+    def pushGeneratedPlot(self, plot, maxValue, fractions=None):
+        # sets the plot and notifies the views, also when the project is already marked as modified
+        self.setMaxPlotValue(maxValue)
+        self.setGeneratedPlot(plot, fractions)
+        self.dispatch("msg_object_modified", {"object": self})
+
     def up(self):
         pass
 
@@ -174,15 +224,28 @@ class Project(wxd.ModelObject):
     def prePreview(self, generator, **setup):
         generator.setup(**setup)
 
-    async def preview(self, **setup):
+    def getPreviewState(self):
+        # everything a preview depends on, used to skip previews of an unchanged project
+        return self.serialize()
+
+    async def configureBackend(self, generator):
+        # the first configure calibrates the backends, which takes seconds, so it runs in the default executor
+        await asyncio.get_running_loop().run_in_executor(None, core.backends.configure, generator, self.getBackend())
+
+    async def preview(self, cancelToken=None, **setup):
         log.debug(function=self.preview, args=(setup))
         generator = self.getGenerator()
         if generator:
             self.prePreview(generator, **setup)
-            generator.setup(size=self.getPreviewSize())
-            await generator.generate()
+            generator.setup(size=self.getPreviewSize(), cancelToken=cancelToken)
+            await self.configureBackend(generator)
+            try:
+                await generator.generate()
+            except core.fgen.GenerationCancelled:
+                log.debug("preview cancelled", function=self.preview)
+                return
             gradient = self.getProjectSource().getGradientPixels(generator.maxValue+1)
-            self.setPreviewImage(core.fgen.getImage(self.getPreviewSize(), generator.plotValues, gradient))
+            self.setPreviewImage(core.fgen.getImage(self.getPreviewSize(), generator.plotValues, gradient, fractions=generator.plotFractions))
 
     def getGenerator(self):
         return None
@@ -190,34 +253,97 @@ class Project(wxd.ModelObject):
     def preGenerate(self, generator, **setup):
         generator.setup(**setup)
 
-    def getFormattedImage(self):
-        log.debug(function=self.getFormattedImage)
-        borderSize = self.getBorderSize()
-        p = self.getBorderColourPick()        
-        pixels = self.getGradientPixels()
+    def getFormattedImage(self, frame=0):
+        log.debug(function=self.getFormattedImage, args=frame)
         try:
             plot = self.getGeneratedPlot()
         except:
             return None
+        return self.formatPlot(plot, self.getMaxPlotValue(), self.getGeneratedFractions(), frame)
+
+    def formatPlot(self, plot, maxValue, fractions=None, frame=0):
+        """
+        returns the formatted frame of plot including the border. Plots of whole iteration counts 
+        are returned as a 'P' mode image, which is recoloured by replacing its palette. Other plots 
+        (smooth colouring or more than 256 values) are coloured as RGB, the gradient used is 
+        kept as info["gradient"]
+        """
+        if plot is None or maxValue==None: return None
+        borderSize = self.getBorderSize()
+        p = self.getBorderColourPick()        
+        pixels = self.getProjectSource().getGradientPixels(maxValue+1)
         if pixels!=None and borderSize!=None and p!=None:
-            borderColour = pixels[p] if p < len(pixels) else (0,0,0)
-            fractalBox = ImageBox(ImageBox.ORIENTATION_HORIZONTAL, borderSize, borderSize, borderColour)
-            fractalBox.addImage(core.fgen.getImage(self.getSize(), plot, pixels))
-            return fractalBox.getImage()
+            if maxValue < len(pixels) and core.fgen.isIndexable(plot, maxValue, fractions):
+                fractalBox = ImageBox(ImageBox.ORIENTATION_HORIZONTAL, borderSize, borderSize, p, mode='P')
+                fractalBox.addImage(core.fgen.getIndexImage(self.getSize(), plot, frame))
+                im = fractalBox.getImage()
+                im.putpalette(core.fgen.getPalette(pixels))
+            else:
+                borderColour = pixels[p] if p < len(pixels) else (0,0,0)
+                fractalBox = ImageBox(ImageBox.ORIENTATION_HORIZONTAL, borderSize, borderSize, borderColour)
+                fractalBox.addImage(core.fgen.getImage(self.getSize(), plot, pixels, frame, fractions))
+                im = fractalBox.getImage()
+                im.info["gradient"] = pixels
+            return im
+        return None
+
+    def postGenerate(self, generator):
+        pass
+
+    def getGenerateState(self):
         return None
 
+    def restoreGenerateState(self, state):
+        pass
+
+    def isGenerating(self):
+        return self.__generation__!=None
+
+    def cancelGenerate(self):
+        # aborts the generation in flight (if any) and undoes what preGenerate changed in the model
+        if self.__generation__!=None:
+            token, state = self.__generation__
+            self.__generation__ = None
+            log.trace(function=self.cancelGenerate)
+            token.cancel()
+            # the views drop the image of the last pass of a cancelled progressive render
+            if self.getPassImage()!=None: self.setPassImage(None)
+            self.restoreGenerateState(state)
+
     async def generate(self, progressHandler=None, **setup):
         log.debug(function=self.generate, args=(setup))
         generator = self.getGenerator()
         if generator:
-            self.preGenerate(generator, **setup)
-            self.setProgress(0)
-            await generator.generate(progressHandler=self.onProgress if progressHandler==None else progressHandler)
-            self.setMaxPlotValue(generator.maxValue)
-            self.setGeneratedPlot(generator.plotValues)
+            self.cancelGenerate()
+            token = core.fgen.CancelToken()
+            generation = (token, self.getGenerateState())
+            self.__generation__ = generation
+            try:
+                generator.setup(cancelToken=token, progressive=self.getProgressive())
+                self.preGenerate(generator, **setup)
+                await self.configureBackend(generator)
+                self.setProgress(0)
+                await generator.generate(progressHandler=self.onProgress if progressHandler==None else progressHandler, 
+                    passHandler=self.onRenderPass if self.getProgressive() else None)
+            except core.fgen.GenerationCancelled:
+                log.trace("generation cancelled")
+                return False
+            except Exception:
+                # a generation that fails is undone like a cancelled one, unless a newer one superseded it
+                if self.__generation__ is generation: self.cancelGenerate()
+                raise
+            finally:
+                if self.__generation__ is generation: self.__generation__ = None
+            if token.isCancelled(): return False
+            self.__passImage__ = None
+            self.postGenerate(generator)
+            self.pushGeneratedPlot(generator.plotValues, generator.maxValue, generator.plotFractions)
             log.trace("generation complete")
+            return True
+        return False
 
     def getGeneratedImage(self):
+        if self.getPassImage()!=None: return self.getPassImage()
         return self.getFormattedImage()
 
     def savePlots(self, storage):
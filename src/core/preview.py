@@ -0,0 +1,94 @@
+#foreign
+import asyncio
+
+#project
+import lib.wxdyn.log as  log
+import core.fgen
+
+class PreviewScheduler:
+    """
+    Renders previews of the current project when it is modified, instead of polling it.
+    Bursts of modifications are debounced, a preview that is superseded by a newer 
+    modification is cancelled, and at most one preview render is in flight at any time.
+    """
+    DEBOUNCE = 0.05
+
+    def __init__(self, model, **setup):
+        self.model = model
+        self.setup = setup
+        self.project = None
+        self.__timer = None
+        self.__task = None
+        self.__token = None
+        self.__pending = False
+        self.__renderedState = None
+
+    def start(self):
+        log.trace(function=self.start)
+        self.model.subscribe(self, "msg_new_project", self.onMsgProjectOpened)
+        self.model.subscribe(self, "msg_open_project", self.onMsgProjectOpened)
+        self.setProject(self.model.getCurrentProject())
+
+    def stop(self):
+        log.trace(function=self.stop)
+        self.model.unsubscribe("msg_new_project", self)
+        self.model.unsubscribe("msg_open_project", self)
+        self.setProject(None)
+
+    def setProject(self, project):
+        if self.project!=None:
+            self.project.unsubscribe("msg_object_changed", self)
+        self.cancel()
+        self.__renderedState = None
+        self.project = project
+        if self.project!=None:
+            # every edit schedules a preview, msg_object_modified is only sent for the first edit after a load or save
+            self.project.subscribe(self, "msg_object_changed", self.onMsgProjectChanged)
+            self.schedule()
+
+    def cancel(self):
+        if self.__timer!=None:
+            self.__timer.cancel()
+            self.__timer = None
+        if self.__token!=None:
+            self.__token.cancel()
+        self.__pending = False
+
+    def isRendering(self):
+        return self.__task!=None and not self.__task.done()
+
+    def onMsgProjectOpened(self, payload):
+        self.setProject(payload["project"])
+
+    def onMsgProjectChanged(self, payload):
+        self.schedule()
+
+    def schedule(self):
+        # restart the debounce timer, so a burst of modifications results in a single render
+        if self.__timer!=None: self.__timer.cancel()
+        self.__timer = asyncio.get_running_loop().call_later(PreviewScheduler.DEBOUNCE, self.render)
+
+    def render(self):
+        self.__timer = None
+        if self.project==None or not self.project.getPreview(): return
+        state = self.project.getPreviewState()
+        if state == self.__renderedState: return
+        if self.isRendering():
+            # supersede the render in flight, the new one starts when it has stopped
+            self.__token.cancel()
+            self.__renderedState = None
+            self.__pending = True
+            return
+        log.debug(function=self.render)
+        self.__renderedState = state
+        self.__token = core.fgen.CancelToken()
+        self.__task = asyncio.ensure_future(self.model.preview(cancelToken=self.__token, **self.setup))
+        self.__task.add_done_callback(self.onPreviewDone)
+
+    def onPreviewDone(self, task):
+        if not task.cancelled() and task.exception()!=None:
+            log.error(task.exception(), function=self.onPreviewDone)
+            self.__renderedState = None
+        if self.__pending:
+            self.__pending = False
+            self.render()
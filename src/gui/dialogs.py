@@ -14,6 +14,12 @@ FILESPEC_PNG = {
     "png": _("PNG Images")
 }
 
+FILESPEC_ANIMATIONS = {
+    "gif": _("GIF Animations"),
+    "png": _("Animated PNG Images"),
+    "webp": _("WebP Animations"),
+}
+
 FILESPEC_PROJECT = {
     "igp": _("Image Generation Project files")
 }
@@ -62,6 +68,11 @@ def saveImageDialog(parentFrame):
         message = _("Open Image"), 
         wildcard = toWildCardString(FILESPEC_PNG))
 
+def saveAnimationDialog(parentFrame):
+    return saveFileDialog(parentFrame, 
+        message = _("Export Animation"), 
+        wildcard = toWildCardString(FILESPEC_ANIMATIONS))
+
 def message(message, style=wx.OK):
     return Messages.getInstance().message(message, style)
 
@@ -8,6 +8,7 @@ import lib.wxdyn.log as  log
 
 from core.model import JuliaProject, GeneratedSet
 import lib.wxdyn.dynctrl as dynctrl 
+import core.backends
 import lib.wxdyn as wxdyn 
 import gui.zoompanel as zoompanel
 import random
@@ -179,6 +180,16 @@ class ProjectPropertiesPanel(ProjectPanel):
         im3 = dynctrl.DynamicBitmap(self, self.projectSource, "gradientImage", size=(150,20))
         im3.SetScaleMode(wx.StaticBitmap.Scale_Fill)
         chkBox1 = dynctrl.DynamicCheckBox(self, self.projectSource, "flipGradient",  label="flip gradient:")
+        lbl5_0 = wx.StaticText(self, label="colouring:", size=(120, 20))
+        chkBox2 = dynctrl.DynamicCheckBox(self, self.project, "smooth",  label="smooth:")
+        lbl6_0 = wx.StaticText(self, label="rendering:", size=(120, 20))
+        chkBox3 = dynctrl.DynamicCheckBox(self, self.project, "progressive",  label="progressive:")
+        chkBox4 = dynctrl.DynamicCheckBox(self, self.project, "resumable",  label="resumable:")
+        lbl7_0 = wx.StaticText(self, label="max iterations:", size=(120, 20))
+        textCtrl7_0 = dynctrl.DynamicSpinCtrl(self, self.project, "maxIt", size=(60, 18), min=16, max=100000, style=wx.SP_ARROW_KEYS)
+        chkBox5 = dynctrl.DynamicCheckBox(self, self.project, "autoMaxIt",  label="automatic:")
+        lbl8_0 = wx.StaticText(self, label="compute backend:", size=(120, 20))
+        choice8_0 = dynctrl.DynamicChoice(self, self.project, "backend", size=(150, 24), choices=core.backends.getBackendNames())
         textCtrl1_1 = dynctrl.DynamicSpinCtrl(self, self.projectSource, "heatmapBaseImageWidth", size=(60, 18), min=4, max=50, style=wx.SP_WRAP|wx.SP_ARROW_KEYS)
         textCtrl1_2 = dynctrl.DynamicSpinCtrl(self, self.projectSource, "heatmapBaseImageHeight", size=(60, 18), min=4, max=50, style=wx.SP_WRAP|wx.SP_ARROW_KEYS)
         textCtrl2_1 = dynctrl.DynamicSpinCtrl(self, self.project, "width", size=(60, 18), min=100, max=4000, style=wx.SP_WRAP|wx.SP_ARROW_KEYS)
@@ -190,6 +201,12 @@ class ProjectPropertiesPanel(ProjectPanel):
             (lbl4_2, 1), (textCtrl4_2, 1),
             (im1, 1), (im2, 1), 
             (im3, 1), (chkBox1, 1),
+            (lbl5_0, 1), (chkBox2, 1),
+            (lbl6_0, 1), (chkBox3, 1),
+            ((0, 0), 1), (chkBox4, 1),
+            (lbl7_0, 1), (textCtrl7_0, 1),
+            ((0, 0), 1), (chkBox5, 1),
+            (lbl8_0, 1), (choice8_0, 1),
             (lbl1_1, 1), (textCtrl1_1, 1), 
             (lbl1_2, 1), (textCtrl1_2, 1), 
             (lbl2_1, 1), (textCtrl2_1, 1), 
@@ -193,27 +193,23 @@ class ZoomPanel(wxd.DynamicCtrl, wx.Panel):
         return self.clientRectToAreaRect(self.__zoomRect__)
 
     def clientRectToAreaRect(self, clientRect):
-        ax,ay,aw,ah = self.__areaRect__
         zrx,zry,zrw,zrh = clientRect
         iw,ih = self.getImageFitSize()
         sx = zrx/iw
         sy = zry/ih
-        sw = aw*self.getZoomScale()
-        sh = ah*self.getZoomScale()
-        nx = ax+sx*aw
-        ny = ay+sy*ah
-        return (nx, ny, sw, sh)
+        # computed by the area in its own (decimal) precision
+        return self.getArea().getSubRect(sx, sy, self.getZoomScale())
 
     def areaRectToClientRect(self, areaRect):
         if areaRect == None: return None
         ax1,ay1,aw1,ah1 = self.__areaRect__ # current area rect
         ax2,ay2,aw2,ah2 = areaRect
-        scale = ah2/ah1
+        scale = float(ah2/ah1)
         iw,ih = self.getImageFitSize()
         rw=iw*scale
         rh=ih*scale
-        rx=iw*(ax2-ax1)/aw1
-        ry=ih*(ay2-ay1)/ah1
+        rx=iw*float((ax2-ax1)/aw1)
+        ry=ih*float((ay2-ay1)/ah1)
         return (rx, ry, rw, rh)
 
     # calculates largest fit while maintaining aspect ratio of the image
@@ -323,7 +319,7 @@ class ZoomPanel(wxd.DynamicCtrl, wx.Panel):
             srcIm = self.modelObject.getProjectSource().getSourceImage()
             if srcIm!=None:
                 srcIm = srcIm.resize(self.calcImageFitSize(srcIm, (w,h)))
-                im = self.__pilImage__.copy()
+                im = self.__pilImage__.convert('RGB')
                 im.paste(srcIm, (int(x),int(y)))
                 im.save(path)
         else:
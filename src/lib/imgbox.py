@@ -6,8 +6,9 @@ class ImageBox:
     ORIENTATION_HORIZONTAL = 0
     ORIENTATION_VERTICAL = 1
     
-    def __init__(self, orientation=ORIENTATION_HORIZONTAL, margin=5, spacing=5, background=(0,0,0)):
-        self.image = Image.new('RGB', (0,0))
+    def __init__(self, orientation=ORIENTATION_HORIZONTAL, margin=5, spacing=5, background=(0,0,0), mode='RGB'):
+        self.mode = mode
+        self.image = Image.new(mode, (0,0))
         self.orientation = orientation
         self.images = []
         self.margin = margin
@@ -35,7 +36,7 @@ class ImageBox:
             total_size = (total_size[0] + im.size[0], total_size[1] if total_size[1] > im.size[1] else im.size[1])
         total_size = (total_size[0] + (len(self.images)-1)*self.spacing + 2*self.margin, total_size[1] + 2*self.margin)
 
-        self.image = Image.new('RGB', total_size, self.background)
+        self.image = Image.new(self.mode, total_size, self.background)
         pos = (self.margin, self.margin)
         for im in self.images:
             self.image.paste(im, pos)
@@ -47,7 +48,7 @@ class ImageBox:
             total_size = (total_size[0] if total_size[0] > im.size[0] else im.size[0], total_size[1] + im.size[1])
         total_size = (total_size[0] + 2*self.margin, total_size[1] + (len(self.images)-1)*self.spacing + 2*self.margin)
 
-        self.image = Image.new('RGB', total_size, self.background)
+        self.image = Image.new(self.mode, total_size, self.background)
         pos = (self.margin, self.margin)
         for im in self.images:
             self.image.paste(im, pos)
@@ -99,6 +99,25 @@ class DynamicCheckBox(DynamicCtrl, wx.CheckBox):
         obj = payload["object"]
         self.SetValue(obj.getAttribute(self.attributeName))
 
+class DynamicChoice(DynamicCtrl, wx.Choice):
+    def __init__(self, parent, modelObject, attributeName, **kw):
+        DynamicCtrl.__init__(self, modelObject, attributeName)
+        super(wx.Choice, self).__init__(parent, **kw)
+        self.SetStringSelection(str(modelObject.getAttribute(self.attributeName)))
+        self.Bind(wx.EVT_CHOICE, self.onUserValueChange) 
+
+    def onUserValueChange(self, e):
+        log.debug(function=self.onUserValueChange, args=e)
+        self.modelObject.setAttribute(self.attributeName, self.GetStringSelection())
+        e.Skip()
+
+    def onModelObjectChange(self, payload):
+        obj = payload["object"]
+        try:
+            self.SetStringSelection(str(obj.getAttribute(self.attributeName)))
+        except:
+            pass
+
 class DynamicBitmap(DynamicCtrl, wx.StaticBitmap):
     def __init__(self, parent, modelObject, attributeName, autoSize=True, **kw):
         DynamicCtrl.__init__(self, modelObject, attributeName)
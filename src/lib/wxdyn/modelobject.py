@@ -4,10 +4,12 @@ from .pubsub import Publisher
 from .persistentobject import PersistentObject
 
 class ModelObject(PersistentObject, Publisher):
-    EVENTS = ["msg_object_modified", "msg_new_child"]
+    EVENTS = ["msg_object_modified", "msg_object_changed", "msg_new_child"]
     """
     This is the base class for all the other model classes. It implements the object 
     hierarchy and the model modification status. 
+    msg_object_modified is sent when the object becomes modified, msg_object_changed on every 
+    modification (of the object or one of its children), e.g. to follow every edit. 
     extends PersistentObject to enable instance of ModelObject to serialize/deserialize their internal state
     extends Publisher to allow Subscriber instances to be notified about the modification state.  
     """
@@ -47,6 +49,7 @@ class ModelObject(PersistentObject, Publisher):
         self.__children__ = {}
 
     def setModified(self):
+        self.dispatch("msg_object_changed", {"object": self} )
         if not self.__modified__:
             log.trace(self.getFullId()+".setModified()")
             self.__modified__ = True
@@ -95,20 +98,25 @@ class ModelObject(PersistentObject, Publisher):
         assert self.isValidChild(childObject) == True
         self.dispatch("msg_new_child", {"object": self, "child": childObject})
         childObject.subscribe(self, "msg_object_modified", self.onMsgChildObjectModified)
+        childObject.subscribe(self, "msg_object_changed", self.onMsgChildObjectChanged)
         self.setModified()
 
     def removeChild(self, childObject):
         log.debug(function=self.removeChild, args=childObject.getFullId())
         assert isinstance(childObject, ModelObject)
-        if childObject.getId() in self.getChildren():
+        if childObject.getId() in self.__children__:
             self.__children__.pop(childObject.getId())
-            childObject.unsubscribe(self.onMsgChildObjectModified, "msg_object_modified")
+            childObject.unsubscribe("msg_object_modified", self)
+            childObject.unsubscribe("msg_object_changed", self)
             self.setModified()
 
     def onMsgChildObjectModified(self, payload):
         log.debug(function=self.onMsgChildObjectModified, args=payload["object"].getFullId())
         self.dispatch("msg_object_modified", {"object": self, "modified": payload})
 
+    def onMsgChildObjectChanged(self, payload):
+        self.dispatch("msg_object_changed", {"object": self, "changed": payload})
+
     def getModificationsFromPayload(self, payload):
         modifications = []
         if "object" in payload:
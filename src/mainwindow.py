@@ -28,6 +28,7 @@ ID_FILE_OPEN_PROJECT=102
 ID_FILE_SAVE_PROJECT=103
 ID_FILE_SAVE_PROJECT_AS=104
 ID_FILE_SAVE_GENERATED_IMAGE=105
+ID_FILE_EXPORT_ANIMATION=106
 
 ID_FILE_EXIT=199
 
@@ -49,7 +50,7 @@ ID_PROJECT_PROPERTIES=321
 ID_DEBUG_SHOWINSPECTIONTOOL=601
 
 ID_GROUP_PROJECTLOADED = []
-for i in range(ID_FILE_SAVE_PROJECT,ID_FILE_SAVE_GENERATED_IMAGE+1): ID_GROUP_PROJECTLOADED.append(i)
+for i in range(ID_FILE_SAVE_PROJECT,ID_FILE_EXPORT_ANIMATION+1): ID_GROUP_PROJECTLOADED.append(i)
 for i in range(ID_PROJECT_SELECT_SOURCEIMAGE, ID_PROJECT_FIT_IMAGE+1): ID_GROUP_PROJECTLOADED.append(i)
 
 RESOURCE_LIST = {
@@ -144,6 +145,7 @@ class MainWindow(wx.Frame):
         self.Bind(event=wx.EVT_MENU, handler=self.onUserReset, id=ID_PROJECT_RESET)
         self.Bind(event=wx.EVT_MENU, handler=self.onUserSelectSourceImage, id=ID_PROJECT_SELECT_SOURCEIMAGE)
         self.Bind(event=wx.EVT_MENU, handler=self.onUserSaveGeneratedImage, id=ID_FILE_SAVE_GENERATED_IMAGE)
+        self.Bind(event=wx.EVT_MENU, handler=self.onUserExportAnimation, id=ID_FILE_EXPORT_ANIMATION)
         self.Bind(event=wx.EVT_MENU, handler=self.onUserSelectZoomMode, id=ID_PROJECT_SELECT_ZOOM_MODE)
         self.Bind(event=wx.EVT_MENU, handler=self.onUserSelectFinishMode, id=ID_PROJECT_SELECT_FINISH_MODE)
         self.Bind(event=wx.EVT_MENU, handler=self.onProjectUp, id=ID_PROJECT_UP)
@@ -253,6 +255,7 @@ class MainWindow(wx.Frame):
         fileMenu.Append(ID_FILE_SAVE_PROJECT_AS, _("&Save project as..."), _("Save current project under a new name"))
         fileMenu.Append(ID_FILE_OPEN_PROJECT, _("&Open project"), _("Open project"))
         fileMenu.Append(ID_FILE_SAVE_GENERATED_IMAGE, _("Save &generated image"), _("Save generated image"))
+        fileMenu.Append(ID_FILE_EXPORT_ANIMATION, _("&Export animation..."), _("Export the generated animation"))
         fileMenu.Append(ID_FILE_EXIT, _("E&xit"), _("Exit"))
 
         projectMenu = wx.Menu()
@@ -325,9 +328,19 @@ class MainWindow(wx.Frame):
     async def generate(self):
         await self.controller.generate(self.statusBar.onProgress, **self.generatorSetup)
 
+    async def exportAnimation(self, path):
+        await self.controller.exportAnimation(path, self.statusBar.onProgress)
+
     async def animate(self):
         await self.controller.animate(self.statusBar.onProgress)
 
+    def onUserExportAnimation(self, e):
+        path = dlg.saveAnimationDialog(self)
+        if path!=None:
+            self.statusBar.start()
+            StartCoroutine(self.exportAnimation(path), self)
+        e.Skip()
+
     def onUserGenerate(self, e):
         if isinstance(e, zoom.ZoomAreaEvent):
             self.generatorSetup = {"area": e.area}
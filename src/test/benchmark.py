@@ -0,0 +1,36 @@
+import time
+import numpy as np
+from core.fgen import *
+
+def timePlot(g, repeat=3):
+    # best of repeat renders, returns (plot values, seconds)
+    best = None
+    for r in range(repeat):
+        t = time.perf_counter()
+        plot, maxValue = g.plot()
+        t = time.perf_counter() - t
+        best = t if best==None else min(best, t)
+    return (plot, best)
+
+def float32(g):
+    # compares the float64 render of g with its automatic float32 render
+    g.setup(float32=False)
+    a, ta = timePlot(g)
+    g.setup(float32=None)
+    b, tb = timePlot(g)
+    print("{} {}: float64 {:.3f}s, auto {:.3f}s ({:.2f}x), {} float32 pixels, {:.3f}% pixels differ".format(
+        type(g).__name__, g.areas[0], ta, tb, ta/tb, g.stats.get("float32Pixels", 0), 100*np.mean(a!=b)))
+
+def float32Benchmarks(size=(800,600)):
+    for area in [(-2.0,1.0,-1.5,1.5), (-1.5,0.5,-0.75,0.75), (-0.8,-0.5,0.0,0.3)]:
+        g = MandelbrotGenerator(None, size, [area], 256)
+        g.setup(workers=1)
+        float32(g)
+    for area in [(-1.6,1.6,-1.2,1.2), (-0.4,0.4,-0.3,0.3)]:
+        g = JuliaGenerator(None, size, [area], (-0.7269, 0.1889), 256)
+        g.setup(workers=1)
+        float32(g)
+
+
+if __name__ == '__main__':
+    float32Benchmarks()
@@ -0,0 +1,125 @@
+import io
+from decimal import Decimal
+import numpy as np
+from PIL import Image
+from core.fgen import *
+from core.model.complex import Area, GeneratedSet, MandelbrotProject
+
+def deepArea(cx, cy, width, aspect=Decimal("0.75")):
+    # area of the given width centred on (cx, cy), with Decimal coordinates
+    cx, cy, width = Decimal(cx), Decimal(cy), Decimal(width)
+    return (cx - width/2, cx + width/2, cy - width*aspect/2, cy + width*aspect/2)
+
+def plotCounts(g, **parameters):
+    g.setup(**parameters)
+    plot, maxValue = g.plot()
+    return plot.copy()
+
+def test_seriesApproximation():
+    # skipping iterations with the series approximation keeps the counts of plain perturbation
+    for cx, cy in [("-0.743643887037158704752191506114774", "0.131825904205311970493132056385139"),
+            ("0.3602404434376143632361252444495", "-0.6413130610648031748603750151793")]:
+        g = MandelbrotGenerator(None, (160,120), [deepArea(cx, cy, "1e-15")], 3000)
+        g.setup(workers=1)
+        plain = plotCounts(g, seriesApproximation=False)
+        assert g.usePerturbation()
+        series = plotCounts(g, seriesApproximation=True)
+        assert g.stats.get("seriesSkippedIterations", 0) > 0
+        assert np.array_equal(plain, series)
+
+def test_float32OptIn():
+    # float32 arithmetic changes counts, by default every pixel is iterated in float64
+    g = MandelbrotGenerator(None, (160,120), [(-2.0,1.0,-1.125,1.125)], 256)
+    g.setup(workers=1)
+    plain = plotCounts(g)
+    assert g.stats.get("float32Pixels", 0) == 0
+    assert np.array_equal(plain, plotCounts(g, float32=False))
+    plotCounts(g, float32=None)
+    assert g.stats.get("float32Pixels", 0) > 0
+
+def test_reusedPan():
+    # a whole pixel pan or a resize of the project area reuses the shared pixels, with the values of a fresh render
+    area = Area(None, MandelbrotProject.DEFAULT_AREA)
+    xa,xb,ya,yb = area.getAdjusted((400,300))
+    with decimalContext(xb - xa):
+        dx, dy = 7*(xb - xa)/399, -4*(yb - ya)/299
+        panned = (xa + dx, xb + dx, ya + dy, yb + dy)
+    for parameters in [dict(), dict(smooth=True)]:
+        for size, newArea in [((400,300), panned), ((500,300), area.getAdjusted((500,300)))]:
+            g = MandelbrotGenerator(None, (400,300), [(xa,xb,ya,yb)], 256)
+            g.setup(workers=1, **parameters)
+            plot = plotCounts(g)
+            g.setup(size=size, areas=[newArea], reuseGrid=g.grid, reusePlot=plot, reuseFractions=g.plotFractions)
+            reused = plotCounts(g)
+            assert g.stats.get("reusedPixels", 0) > 0
+            fresh = MandelbrotGenerator(None, size, [newArea], 256)
+            fresh.setup(workers=1, **parameters)
+            assert np.array_equal(reused, plotCounts(fresh))
+            if g.plotFractions is not None: assert np.array_equal(g.plotFractions, fresh.plotFractions)
+
+def test_resumedSmooth():
+    # raising maxIt resumes a smooth plot with the values of a fresh render
+    area = (-0.76,-0.74,0.09,0.11)
+    g = MandelbrotGenerator(None, (160,120), [area], 256)
+    g.setup(workers=1, smooth=True, keepState=True)
+    counts = plotCounts(g)
+    g.setup(maxIt=1024, resumePlot=counts, resumeFractions=g.plotFractions.copy(), resumeState=g.state)
+    resumed = plotCounts(g)
+    assert g.stats.get("resumedPixels", 0) > 0
+    fresh = MandelbrotGenerator(None, (160,120), [area], 1024)
+    fresh.setup(workers=1, smooth=True)
+    assert np.array_equal(resumed, plotCounts(fresh))
+    assert np.array_equal(g.plotFractions, fresh.plotFractions)
+
+def test_vectorizedMatchesScalar():
+    # the vectorized engine gives the counts of the scalar loops
+    for g in [MandelbrotGenerator(None, (64,48), [(-2.0,1.0,-1.125,1.125)], 256),
+            JuliaGenerator(None, (64,48), [(-1.6,1.6,-1.2,1.2)], (-0.8,0.156), 256)]:
+        g.setup(workers=1)
+        assert np.array_equal(plotCounts(g, vectorized=False), plotCounts(g, vectorized=True))
+
+def test_heatmapCounts():
+    # the heatmap of Source counts the colors like a pixel by pixel count of the base image
+    rng = np.random.default_rng(9)
+    im = Image.fromarray(rng.choice([0, 64, 255], size=(10,10,3)).astype(np.uint8), "RGB")
+    source = Source(im)
+    img = source.heatmapBaseImage
+    w, h = img.size
+    colorCount = {}
+    for x in range(w):
+        for y in range(h):
+            rgb = img.getpixel((x, y))
+            colorCount[rgb] = colorCount.get(rgb, 0) + 1
+    heatmap = []
+    step = 0.0
+    for c in sorted(colorCount):
+        r,g,b = c
+        heatmap.append([round(step, 3), (round(r/255, 3), round(g/255, 3), round(b/255, 3))])
+        step += colorCount[c]*(1+1/len(colorCount))/(w*h)
+    assert source.heatmap == heatmap
+
+def test_legacyPlots():
+    # float64 plots saved before the counts were compacted load with the same values
+    for smooth in [False, True]:
+        g = MandelbrotGenerator(None, (64,48), [(-2.0,1.0,-1.125,1.125)], 1000)
+        g.setup(workers=1, smooth=smooth)
+        counts = plotCounts(g)
+        values = joinValues(counts, g.plotFractions)
+        saved = io.BytesIO()
+        np.savez_compressed(saved, main=values)
+        saved.seek(0)
+        gs = GeneratedSet(None, "main")
+        gs.setPlots(np.load(saved))
+        assert gs.getGeneratedPlot().dtype==counts.dtype
+        assert (gs.getGeneratedFractions() is None)==(not smooth)
+        assert np.array_equal(joinValues(gs.getGeneratedPlot(), gs.getGeneratedFractions()), values)
+
+def test_mirroredPlots():
+    # filling the mirror images of the pixels gives the counts of iterating every pixel
+    for g in [MandelbrotGenerator(None, (64,49), [(-2.0,1.0,-1.125,1.125)], 256),
+            JuliaGenerator(None, (64,48), [(-1.6,1.6,-1.2,1.2)], (-0.8,0.156), 256)]:
+        g.setup(workers=1)
+        plain = plotCounts(g, symmetry=False)
+        mirrored = plotCounts(g, symmetry=True)
+        assert g.stats.get("mirroredPixels", 0) > 0
+        assert np.array_equal(plain, mirrored)
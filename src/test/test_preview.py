@@ -0,0 +1,36 @@
+import asyncio
+import lib.wxdyn as wxd
+from core.model import MandelbrotProject
+from core.preview import PreviewScheduler
+
+class PreviewModel(wxd.Publisher):
+    # the part of Model the scheduler uses, counts the previews it is asked for
+    def __init__(self, project):
+        wxd.Publisher.__init__(self, ["msg_new_project", "msg_open_project"])
+        self.project = project
+        self.previews = 0
+
+    def getCurrentProject(self):
+        return self.project
+
+    async def preview(self, cancelToken=None, **setup):
+        self.previews += 1
+
+def test_everyEditSchedulesPreview():
+    # every edit renders a preview, not only the first one after a load or save
+    async def edit():
+        project = MandelbrotProject()
+        project.setPreview(True)
+        model = PreviewModel(project)
+        scheduler = PreviewScheduler(model)
+        scheduler.start()
+        await asyncio.sleep(2*PreviewScheduler.DEBOUNCE)
+        previews = model.previews
+        project.setWidth(500)
+        await asyncio.sleep(2*PreviewScheduler.DEBOUNCE)
+        project.getProjectSource().setFlipGradient(not project.getProjectSource().getFlipGradient())
+        await asyncio.sleep(2*PreviewScheduler.DEBOUNCE)
+        scheduler.stop()
+        return model.previews - previews
+    wxd.MessageQueue.getInstance(True)
+    assert asyncio.run(edit()) == 2